@@ -1,28 +1,111 @@
-from flask import Flask, request, render_template, send_file, flash, redirect, url_for
+from flask import Flask, Response, request, render_template, send_file, flash, redirect, url_for, jsonify
 from werkzeug.utils import secure_filename
+import io
 import os
+import atexit
+import threading
 import tempfile
+import mimetypes
 from datetime import datetime
+from itertools import chain
 import uuid
 
-# Import des services PDF
-from services.pdf_merger import PDFMerger
-from services.pdf_compressor import PDFCompressor
-from services.pdf_converter import PDFConverter
-from services.pdf_splitter import PDFSplitter
+# Import des services PDF (les services de traitement sont chargés à la demande, voir service_registry)
+from services.service_registry import ServiceRegistry
+from services.result_cache import ResultCache
+from services.job_manager import JobManager
+from services.zip_stream import stream_zip
+from services.upload_stream import PDFUploadRequest, InvalidPDFUpload
+from services.ghostscript_pool import GhostscriptPool, find_ghostscript
+from services.incompressible_registry import IncompressibleRegistry
+
+# Extraction de mise en page : les résultats .jsonl (servis depuis le cache) gardent leur type
+mimetypes.add_type('application/x-ndjson', '.jsonl')
 
 app = Flask(__name__)
+# Les PDF uploadés sont écrits directement dans uploads/, hachés et vérifiés pendant la réception
+app.request_class = PDFUploadRequest
 app.secret_key = 'your-secret-key-change-this'
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max
+app.config['RESULT_CACHE_MAX_BYTES'] = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', os.cpu_count() or 1))
+app.config['JOB_WORKER_MAX_TASKS'] = int(os.environ.get('JOB_WORKER_MAX_TASKS', 20))  # recyclage des workers
+app.config['JOB_MAX_QUEUE'] = int(os.environ.get('JOB_MAX_QUEUE', 100))
+# Requêtes jusqu'à cette taille traitées en mémoire, sans passer par uploads/ ni output/
+app.config['IN_MEMORY_THRESHOLD'] = int(os.environ.get('IN_MEMORY_THRESHOLD', 5 * 1024 * 1024))
+# Services chargés au démarrage plutôt qu'à leur première requête ('all', 'converter,merger'...)
+app.config['PRELOAD_SERVICES'] = os.environ.get('PRELOAD_SERVICES', '')
+app.config['GS_POOL_SIZE'] = int(os.environ.get('GS_POOL_SIZE', 2))  # 0 = un processus gs par requête
+app.config['GS_POOL_MAX_JOBS'] = int(os.environ.get('GS_POOL_MAX_JOBS', 100))  # redémarrage après N travaux
+app.config['GS_TIMEOUT'] = int(os.environ.get('GS_TIMEOUT', 60))
+# Moteur de compression par défaut : Ghostscript s'il est installé, PyMuPDF sinon
+app.config['COMPRESS_ENGINE'] = os.environ.get('COMPRESS_ENGINE',
+                                               'ghostscript' if find_ghostscript() is not None else 'pymupdf')
 
 # Configuration des dossiers
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'output'
+CACHE_FOLDER = 'cache'
+JOBS_FOLDER = 'jobs'
+INCOMPRESSIBLE_REGISTRY = 'incompressible.json'
 ALLOWED_EXTENSIONS = {'pdf'}
 
 # Créer les dossiers s'ils n'existent pas
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+PDFUploadRequest.upload_folder = UPLOAD_FOLDER
+PDFUploadRequest.allowed_extensions = ALLOWED_EXTENSIONS
+PDFUploadRequest.in_memory_threshold = app.config['IN_MEMORY_THRESHOLD']
+
+# Cache des résultats partagé par toutes les routes
+result_cache = ResultCache(CACHE_FOLDER, app.config['RESULT_CACHE_MAX_BYTES'])
+
+# Documents que la compression n'a pas réduits : les demandes suivantes renvoient l'original directement
+incompressible_registry = IncompressibleRegistry(INCOMPRESSIBLE_REGISTRY)
+
+# Interpréteurs Ghostscript chauds : démarrés à la première compression qui en a besoin.
+# Les workers de l'API asynchrone (démarrage spawn) réimportent ce module : rien n'y est lancé à l'import.
+ghostscript_pool = None
+_ghostscript_pool_lock = threading.Lock()
+
+def get_ghostscript_pool():
+    """
+    Pool d'interpréteurs Ghostscript du processus, créé au premier appel
+    
+    Returns:
+        GhostscriptPool ou None: None si le pool est désactivé (GS_POOL_SIZE=0) ou Ghostscript absent
+    """
+    global ghostscript_pool
+    if app.config['GS_POOL_SIZE'] <= 0 or find_ghostscript() is None:
+        return None
+    with _ghostscript_pool_lock:
+        if ghostscript_pool is None:
+            ghostscript_pool = GhostscriptPool(size=app.config['GS_POOL_SIZE'],
+                                               max_jobs_per_interpreter=app.config['GS_POOL_MAX_JOBS'],
+                                               timeout=app.config['GS_TIMEOUT'],
+                                               allowed_dirs=[UPLOAD_FOLDER, OUTPUT_FOLDER])
+            atexit.register(ghostscript_pool.shutdown)
+    return ghostscript_pool
+
+# Services de traitement : PyMuPDF, PIL et pdf2docx ne sont importés qu'à la première requête
+# qui en a besoin ; PRELOAD_SERVICES ('all' ou liste de noms) les charge dès le démarrage
+service_registry = ServiceRegistry()
+service_registry.register('merger', 'services.pdf_merger:PDFMerger')
+service_registry.register('compressor', 'services.pdf_compressor:PDFCompressor')
+service_registry.register('converter', 'services.pdf_converter:PDFConverter',
+                          preload=['pdf2docx', 'services.docx_stitch'])
+service_registry.register('splitter', 'services.pdf_splitter:PDFSplitter')
+if app.config['PRELOAD_SERVICES'] == 'all':
+    service_registry.warm_up()
+elif app.config['PRELOAD_SERVICES']:
+    service_registry.warm_up(name.strip() for name in app.config['PRELOAD_SERVICES'].split(','))
+
+# Pool de processus pour l'API asynchrone (créé au premier job)
+job_manager = JobManager(JOBS_FOLDER,
+                         max_workers=app.config['JOB_WORKERS'],
+                         max_tasks_per_worker=app.config['JOB_WORKER_MAX_TASKS'],
+                         max_queue=app.config['JOB_MAX_QUEUE'],
+                         result_cache=result_cache)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -38,10 +121,166 @@ def cleanup_old_files():
                 if current_time - os.path.getmtime(filepath) > 3600:  # 1 heure
                     os.remove(filepath)
 
+def uploaded_path(file):
+    """Chemin du PDF uploadé : il a déjà été écrit dans uploads/ pendant la réception"""
+    return file.stream.path
+
+def upload_source(file):
+    """Source du PDF uploadé : son contenu pour un petit upload gardé en mémoire, son chemin sinon"""
+    if file.stream.path is None:
+        return file.stream.getvalue()
+    return file.stream.path
+
+def discard_upload(source):
+    """Supprime le fichier d'un upload sur disque (rien à faire pour un upload en mémoire)"""
+    if isinstance(source, str) and os.path.exists(source):
+        os.remove(source)
+
+def produce_result(cache_key, source, output_path, produce):
+    """
+    Produit un artefact et le met en cache
+    
+    Une source en mémoire produit directement des octets (output_path n'est pas utilisé) ;
+    une source sur disque écrit l'artefact dans output_path.
+    
+    Args:
+        cache_key: Clé du cache de résultats
+        source: Source du PDF (chemin ou octets)
+        output_path: Chemin de l'artefact pour une source sur disque
+        produce: Fonction appelée avec output_path, ou None pour retourner les octets
+    
+    Returns:
+        str ou bytes: Chemin à servir, ou contenu de l'artefact
+    """
+    if isinstance(source, str):
+        produce(output_path)
+        return result_cache.put(cache_key, output_path)
+    
+    data = produce(None)
+    result_cache.put_bytes(cache_key, data, os.path.splitext(output_path)[1])
+    return data
+
+def send_result(result, download_name):
+    """Envoie un artefact produit sur disque (chemin) ou en mémoire (octets)"""
+    if isinstance(result, bytes):
+        return send_file(io.BytesIO(result), as_attachment=True, download_name=download_name)
+    return send_file(result, as_attachment=True, download_name=download_name)
+
+def with_compression_headers(response, original_size, result, engine):
+    """Ajoute à la réponse la taille d'origine, la taille produite et le moteur utilisé"""
+    result_size = len(result) if isinstance(result, bytes) else os.path.getsize(result)
+    response.headers['X-Original-Size'] = str(original_size)
+    response.headers['X-Compressed-Size'] = str(result_size)
+    response.headers['X-Compression-Engine'] = engine
+    return response
+
+def with_deduplication_headers(response, report):
+    """Ajoute à la réponse le bilan de la fusion des images et polices répétées"""
+    if report is not None:
+        response.headers['X-Objects-Collapsed'] = str(report['objects_collapsed'])
+        response.headers['X-Bytes-Saved'] = str(report['bytes_saved'])
+    return response
+
+def with_page_classes_header(response, pages):
+    """Résume les décisions page par page : « vector=1-2,6; photo=3; scan=4-5 »"""
+    ranges = {}
+    for page in pages:
+        page_ranges = ranges.setdefault(page['class'], [])
+        if page_ranges and page_ranges[-1][1] == page['page'] - 1:
+            page_ranges[-1][1] = page['page']
+        else:
+            page_ranges.append([page['page'], page['page']])
+    response.headers['X-Page-Classes'] = '; '.join(
+        f"{page_class}=" + ','.join(str(first) if first == last else f"{first}-{last}" for first, last in page_ranges)
+        for page_class, page_ranges in ranges.items()
+    )
+    return response
+
+def cached_result(operation, input_hashes, params=None):
+    """
+    Calcule la clé de cache d'une opération et retourne (clé, artefact en cache ou None)
+    
+    Les empreintes des entrées sont calculées pendant l'upload (file.stream.sha256).
+    """
+    key = ResultCache.make_key(operation, input_hashes, params)
+    return key, result_cache.get(key)
+
+def zip_stream_response(entries, download_name, cache_key, cleanup_sources):
+    """
+    Envoie une archive ZIP au fil de l'eau et la met en cache une fois complète
+    
+    La première entrée est produite avant de répondre : une erreur de validation ou de
+    rendu de la première page remonte encore à la route appelante. À la fermeture de la
+    réponse (même jamais parcourue), l'archive et ses entrées sont fermées et les uploads
+    supprimés (voir stream_response).
+    """
+    return stream_response(stream_zip(entries), download_name, 'application/zip', '.zip',
+                           cache_key, cleanup_sources)
+
+def stream_response(chunks, download_name, mimetype, suffix, cache_key, cleanup_sources):
+    """
+    Envoie un artefact produit morceau par morceau (octets) et le met en cache une fois complet
+    
+    Le premier morceau est produit avant de répondre, pour que ses erreurs remontent à la route.
+    Les uploads sont supprimés à la fermeture de la réponse, y compris quand elle n'est jamais
+    parcourue (client parti avant le premier octet).
+    """
+    producer = iter(chunks)
+    first_chunk = next(producer, None)
+    chunks = producer if first_chunk is None else chain([first_chunk], producer)
+    
+    def generate():
+        cache_file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+        completed = False
+        try:
+            for chunk in chunks:
+                cache_file.write(chunk)
+                yield chunk
+            completed = True
+        finally:
+            cache_file.close()
+            if completed:
+                result_cache.put(cache_key, cache_file.name)
+            elif os.path.exists(cache_file.name):
+                os.remove(cache_file.name)
+    
+    def cleanup():
+        # Un producteur interrompu libère ses ressources (documents ouverts, processus) avant les uploads
+        close = getattr(producer, 'close', None)
+        if close is not None:
+            close()
+        for source in cleanup_sources:
+            discard_upload(source)
+    
+    response = Response(generate(), mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename={download_name}'})
+    response.call_on_close(cleanup)
+    return response
+
+@app.errorhandler(InvalidPDFUpload)
+def invalid_pdf_upload(e):
+    # Upload interrompu : supprimer les fichiers déjà reçus dans la même requête
+    request.discard_uploads()
+    if request.path.startswith('/api/'):
+        return jsonify({'error': e.description}), e.code
+    flash(e.description)
+    return redirect(request.url)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+@app.route('/api/ghostscript/stats')
+def ghostscript_stats():
+    # Pas encore démarré (aucune compression Ghostscript servie) : pas de statistiques
+    if ghostscript_pool is None:
+        return jsonify({'available': find_ghostscript() is not None, 'pool': None})
+    return jsonify({'available': True, 'pool': ghostscript_pool.stats()})
+
 @app.route('/merge', methods=['GET', 'POST'])
 def merge_pdfs():
     if request.method == 'GET':
@@ -55,46 +294,57 @@ def merge_pdfs():
     files = request.files.getlist('files[]')
     
     if len(files) < 2:
+        request.discard_uploads()
         flash('Au moins 2 fichiers PDF sont requis pour la fusion')
         return redirect(request.url)
     
-    # Sauvegarder les fichiers uploadés
+    # Fichiers uploadés (déjà écrits dans uploads/ ou gardés en mémoire pendant la réception)
     uploaded_files = []
+    input_hashes = []
     session_id = str(uuid.uuid4())
     
     try:
         for file in files:
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                # Ajouter timestamp pour éviter les conflits
-                unique_filename = f"{session_id}_{filename}"
-                filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-                file.save(filepath)
-                uploaded_files.append(filepath)
+                uploaded_files.append(upload_source(file))
+                input_hashes.append(file.stream.sha256)
         
         if len(uploaded_files) < 2:
+            for source in uploaded_files:
+                discard_upload(source)
             flash('Au moins 2 fichiers PDF valides sont requis')
             return redirect(request.url)
         
-        # Fusionner les PDF
-        merger = PDFMerger()
-        output_filename = f"merged_{session_id}.pdf"
-        output_path = os.path.join(OUTPUT_FOLDER, output_filename)
+        # Moteur de fusion : PyMuPDF par défaut, PyPDF2 en solution de repli
+        engine = request.form.get('engine', 'pymupdf')
+        cache_key, output_path = cached_result('merge', input_hashes, {'engine': engine})
         
-        merger.merge_pdfs(uploaded_files, output_path)
+        if output_path is None:
+            # Fusionner les PDF
+            merger = service_registry.create('merger')
+            output_filename = f"merged_{session_id}.pdf"
+            output_path = os.path.join(OUTPUT_FOLDER, output_filename)
+            
+            # Le seuil porte sur la requête entière : les fichiers sont tous en mémoire ou tous sur disque
+            output_path = produce_result(cache_key, uploaded_files[0], output_path,
+                                         lambda path: merger.merge_pdfs(uploaded_files, path, engine=engine))
+            deduplication = merger.last_report
+            # Gardé avec l'artefact : un succès de cache renvoie les mêmes en-têtes
+            result_cache.set_metadata(cache_key, {'deduplication': deduplication})
+        else:
+            deduplication = (result_cache.get_metadata(cache_key) or {}).get('deduplication')
         
         # Nettoyer les fichiers uploadés
-        for filepath in uploaded_files:
-            if os.path.exists(filepath):
-                os.remove(filepath)
+        for source in uploaded_files:
+            discard_upload(source)
         
-        return send_file(output_path, as_attachment=True, download_name=f"merged_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf")
+        return with_deduplication_headers(
+            send_result(output_path, f"merged_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"), deduplication)
     
     except Exception as e:
         # Nettoyer en cas d'erreur
-        for filepath in uploaded_files:
-            if os.path.exists(filepath):
-                os.remove(filepath)
+        for source in uploaded_files:
+            discard_upload(source)
         flash(f'Erreur lors de la fusion: {str(e)}')
         return redirect(request.url)
 
@@ -110,7 +360,6 @@ def compress():
         return redirect(request.url)
     
     file = request.files['file']
-    quality = request.form.get('quality', 'medium')
     
     if file.filename == '':
         flash('Aucun fichier sélectionné')
@@ -118,38 +367,124 @@ def compress():
     
     if file and allowed_file(file.filename):
         session_id = str(uuid.uuid4())
-        filename = secure_filename(file.filename)
-        unique_filename = f"{session_id}_{filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
+        source = upload_source(file)
         
         try:
-            # Sauvegarder le fichier uploadé
-            file.save(filepath)
             
-            # Compresser le PDF
-            compressor = PDFCompressor()
-            output_filename = f"compressed_{session_id}.pdf"
-            output_path = os.path.join(OUTPUT_FOLDER, output_filename)
+            compress_params = parse_compress_params(request.form)
+            quality, engine = compress_params['quality'], compress_params['engine']
+            download_name = f"compressed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+            
+            content_aware = compress_params.get('content_aware', False)
+            # Le registre ne vaut que pour un niveau de qualité seul (ni taille cible, ni traitement par page)
+            plain_quality = 'target_size' not in compress_params and not content_aware
+            
+            # Document déjà trouvé incompressible : renvoyer l'original sans recompresser
+            if plain_quality and incompressible_registry.is_incompressible(file.stream.sha256, engine, quality):
+                response = with_compression_headers(send_result(source, download_name),
+                                                    file.stream.size, source, 'original')
+                discard_upload(source)
+                return response
             
-            compressor.compress_pdf(filepath, output_path, quality)
+            cache_key, output_path = cached_result('compress', [file.stream.sha256], compress_params)
+            used_engine = engine
+            pages = deduplication = None
+            
+            if output_path is None:
+                # Compresser le PDF (jamais plus lourd que l'original)
+                pool = get_ghostscript_pool() if engine == 'ghostscript' else None
+                compressor = service_registry.create('compressor', pool=pool,
+                                                     timeout=app.config['GS_TIMEOUT'], engine=engine)
+                output_filename = f"compressed_{session_id}.pdf"
+                output_path = os.path.join(OUTPUT_FOLDER, output_filename)
+                
+                output_path = produce_result(cache_key, source, output_path,
+                                             lambda path: compressor.compress_pdf(
+                                                 source, path, quality,
+                                                 target_size=compress_params.get('target_size'),
+                                                 content_aware=content_aware))
+                used_engine = compressor.last_report['engine']
+                pages = compressor.last_report.get('pages')
+                deduplication = compressor.last_report.get('deduplication')
+                # Gardés avec l'artefact : un succès de cache renvoie les mêmes en-têtes
+                result_cache.set_metadata(cache_key, {'engine': used_engine, 'pages': pages,
+                                                      'deduplication': deduplication})
+                if compressor.last_report['incompressible'] and plain_quality:
+                    incompressible_registry.record(file.stream.sha256, engine, quality)
+            else:
+                metadata = result_cache.get_metadata(cache_key) or {}
+                used_engine = metadata.get('engine', engine)
+                pages = metadata.get('pages')
+                deduplication = metadata.get('deduplication')
+                if content_aware and pages is None:
+                    # Métadonnées absentes : seule l'analyse des pages est refaite pour le rapport
+                    pages = service_registry.create('compressor').analyze_pages(source)
             
             # Nettoyer le fichier uploadé
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            discard_upload(source)
             
-            return send_file(output_path, as_attachment=True, 
-                           download_name=f"compressed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf")
+            response = with_compression_headers(send_result(output_path, download_name),
+                                                file.stream.size, output_path, used_engine)
+            if pages is not None:
+                with_page_classes_header(response, pages)
+            return with_deduplication_headers(response, deduplication)
         
         except Exception as e:
             # Nettoyer en cas d'erreur
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            discard_upload(source)
             flash(f'Erreur lors de la compression: {str(e)}')
             return redirect(request.url)
     
     flash('Fichier non valide. Seuls les fichiers PDF sont acceptés.')
     return redirect(request.url)
 
+@app.route('/api/compress/compare', methods=['POST'])
+def compare_compression():
+    """Compresse le document avec chaque moteur et retourne taille produite et durée de chacun"""
+    file = request.files.get('file')
+    if not file or not allowed_file(file.filename):
+        return jsonify({'error': 'Aucun fichier PDF valide'}), 400
+    
+    source = upload_source(file)
+    try:
+        compressor = service_registry.create('compressor', pool=get_ghostscript_pool(),
+                                             timeout=app.config['GS_TIMEOUT'])
+        return jsonify(compressor.compare_engines(source, request.form.get('quality', 'medium')))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        discard_upload(source)
+
+@app.route('/api/compress/pages', methods=['POST'])
+def analyze_compression_pages():
+    """Classe chaque page (texte/vectoriel, photo, scan noir et blanc) et indique le traitement prévu"""
+    file = request.files.get('file')
+    if not file or not allowed_file(file.filename):
+        return jsonify({'error': 'Aucun fichier PDF valide'}), 400
+    
+    source = upload_source(file)
+    try:
+        return jsonify({'pages': service_registry.create('compressor').analyze_pages(source)})
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        discard_upload(source)
+
+@app.route('/api/compress/estimate', methods=['POST'])
+def estimate_compression():
+    """Estime rapidement la taille produite par chaque niveau de compression"""
+    file = request.files.get('file')
+    if not file or not allowed_file(file.filename):
+        return jsonify({'error': 'Aucun fichier PDF valide'}), 400
+    
+    source = upload_source(file)
+    try:
+        return jsonify(service_registry.create('compressor').get_compression_info(source))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        discard_upload(source)
+
 # Route pour la conversion PDF
 @app.route('/convert', methods=['GET', 'POST'])
 def convert():
@@ -171,74 +506,83 @@ def convert():
     
     if file and allowed_file(file.filename):
         session_id = str(uuid.uuid4())
-        filename = secure_filename(file.filename)
-        unique_filename = f"{session_id}_{filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
+        source = upload_source(file)
         
         try:
-            # Sauvegarder le fichier uploadé
-            file.save(filepath)
             
-            converter = PDFConverter()
+            converter = service_registry.create('converter')
+            # Pages demandées (toutes par défaut), même syntaxe que la division : "1,3,5-8"
+            pages_params = parse_pages_params(request.form)
+            pages = pages_params.get('pages')
             
             if conversion_type == 'images':
-                # Convertir PDF en images
-                output_dir = os.path.join(OUTPUT_FOLDER, f"images_{session_id}")
-                image_paths = converter.pdf_to_images(filepath, output_dir, format_type)
-                
-                # Créer une archive ZIP des images
-                import zipfile
-                zip_filename = f"images_{session_id}.zip"
-                zip_path = os.path.join(OUTPUT_FOLDER, zip_filename)
+                cache_key, zip_path = cached_result('images', [file.stream.sha256],
+                                                    {'format': format_type, 'dpi': 150, **pages_params})
                 
-                with zipfile.ZipFile(zip_path, 'w') as zipf:
-                    for image_path in image_paths:
-                        zipf.write(image_path, os.path.basename(image_path))
+                if zip_path is None:
+                    # Convertir PDF en images, envoyées dans le ZIP au fur et à mesure du rendu
+                    images = converter.iter_images(source, format_type, pages=pages)
+                    return zip_stream_response(images,
+                                               f"images_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                                               cache_key, [source])
                 
-                # Nettoyer les fichiers temporaires
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                for image_path in image_paths:
-                    if os.path.exists(image_path):
-                        os.remove(image_path)
-                if os.path.exists(output_dir):
-                    os.rmdir(output_dir)
+                discard_upload(source)
                 
                 return send_file(zip_path, as_attachment=True, 
                                download_name=f"images_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
             
             elif conversion_type == 'word':
-                # Convertir PDF en Word
-                output_filename = f"converted_{session_id}.docx"
-                output_path = os.path.join(OUTPUT_FOLDER, output_filename)
+                cache_key, output_path = cached_result('word', [file.stream.sha256], pages_params or None)
                 
-                converter.pdf_to_word(filepath, output_path)
+                if output_path is None:
+                    # Convertir PDF en Word
+                    output_filename = f"converted_{session_id}.docx"
+                    output_path = os.path.join(OUTPUT_FOLDER, output_filename)
+                    
+                    # Lots terminés partagés avec l'API asynchrone : une nouvelle tentative reprend
+                    checkpoint_dir = job_manager.checkpoint_dir(cache_key)
+                    output_path = produce_result(cache_key, source, output_path,
+                                                 lambda path: converter.pdf_to_word(source, path, pages,
+                                                                                    checkpoint_dir=checkpoint_dir))
                 
                 # Nettoyer le fichier uploadé
-                if os.path.exists(filepath):
-                    os.remove(filepath)
+                discard_upload(source)
                 
-                return send_file(output_path, as_attachment=True, 
-                               download_name=f"converted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx")
+                return send_result(output_path, f"converted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx")
             
             elif conversion_type == 'text':
-                # Extraire le texte du PDF
-                output_filename = f"extracted_text_{session_id}.txt"
-                output_path = os.path.join(OUTPUT_FOLDER, output_filename)
+                cache_key, output_path = cached_result('text', [file.stream.sha256], pages_params or None)
+                download_name = f"extracted_text_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
                 
-                converter.pdf_to_text(filepath, output_path)
+                if output_path is None:
+                    # Extraire le texte du PDF, envoyé page par page
+                    chunks = converter.iter_text(source, pages)
+                    return stream_response((chunk.encode('utf-8') for chunk in chunks), download_name,
+                                           'text/plain; charset=utf-8', '.txt', cache_key, [source])
                 
                 # Nettoyer le fichier uploadé
-                if os.path.exists(filepath):
-                    os.remove(filepath)
+                discard_upload(source)
+                
+                return send_result(output_path, download_name)
+            
+            elif conversion_type == 'layout':
+                layout_params = parse_layout_params(request.form)
+                cache_key, output_path = cached_result('layout', [file.stream.sha256], layout_params)
+                download_name = f"layout_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
                 
-                return send_file(output_path, as_attachment=True, 
-                               download_name=f"extracted_text_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+                if output_path is None:
+                    # Structure du texte en JSON Lines, envoyée page par page
+                    chunks = converter.iter_layout(source, layout_params.get('pages'), layout_params['compact'])
+                    return stream_response((chunk.encode('utf-8') for chunk in chunks), download_name,
+                                           'application/x-ndjson', '.jsonl', cache_key, [source])
+                
+                discard_upload(source)
+                
+                return send_result(output_path, download_name)
         
         except Exception as e:
             # Nettoyer en cas d'erreur
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            discard_upload(source)
             flash(f'Erreur lors de la conversion: {str(e)}')
             return redirect(request.url)
     
@@ -262,28 +606,21 @@ def pdf_info():
         return redirect(request.url)
     
     if file and allowed_file(file.filename):
-        session_id = str(uuid.uuid4())
-        filename = secure_filename(file.filename)
-        unique_filename = f"{session_id}_{filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
+        source = upload_source(file)
         
         try:
-            # Sauvegarder le fichier uploadé
-            file.save(filepath)
             
-            converter = PDFConverter()
-            info = converter.get_pdf_info(filepath)
+            converter = service_registry.create('converter')
+            info = converter.get_pdf_info(source)
             
             # Nettoyer le fichier uploadé
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            discard_upload(source)
             
             return render_template('info_result.html', info=info)
         
         except Exception as e:
             # Nettoyer en cas d'erreur
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            discard_upload(source)
             flash(f'Erreur lors de l\'analyse: {str(e)}')
             return redirect(request.url)
     
@@ -302,87 +639,242 @@ def split_pdf():
         return redirect(request.url)
     
     file = request.files['file']
-    split_method = request.form.get('split_method', 'pages')
     
     if file.filename == '':
         flash('Aucun fichier sélectionné')
         return redirect(request.url)
     
     if file and allowed_file(file.filename):
-        session_id = str(uuid.uuid4())
-        filename = secure_filename(file.filename)
-        unique_filename = f"{session_id}_{filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
+        source = upload_source(file)
         
         try:
-            # Sauvegarder le fichier uploadé
-            file.save(filepath)
             
-            splitter = PDFSplitter()
-            output_dir = os.path.join(OUTPUT_FOLDER, f"split_{session_id}")
+            splitter = service_registry.create('splitter')
+            split_params = parse_split_params(request.form)
             
-            if split_method == 'pages':
-                # Division par pages spécifiques
-                pages_input = request.form.get('pages', '')
-                if not pages_input:
-                    raise ValueError("Veuillez spécifier les numéros de pages")
-                
-                # Parser les numéros de pages (ex: "1,3,5-8,10")
-                page_numbers = parse_page_numbers(pages_input)
-                output_files = splitter.split_by_pages(filepath, output_dir, page_numbers)
-                
-            elif split_method == 'range':
-                # Division par plages
-                ranges_input = request.form.get('ranges', '')
-                if not ranges_input:
-                    raise ValueError("Veuillez spécifier les plages de pages")
-                
-                ranges = parse_page_ranges(ranges_input)
-                output_files = splitter.split_by_range(filepath, output_dir, ranges)
-                
-            elif split_method == 'every_n_pages':
-                # Division par groupes de N pages
-                n_pages = int(request.form.get('n_pages', 1))
-                if n_pages < 1:
-                    raise ValueError("Le nombre de pages doit être supérieur à 0")
-                
-                output_files = splitter.split_every_n_pages(filepath, output_dir, n_pages)
-                
-            elif split_method == 'bookmarks':
-                # Division par signets
-                output_files = splitter.split_by_bookmarks(filepath, output_dir)
-            
-            # Créer une archive ZIP des fichiers divisés
-            import zipfile
-            zip_filename = f"split_{session_id}.zip"
-            zip_path = os.path.join(OUTPUT_FOLDER, zip_filename)
+            cache_key, zip_path = cached_result('split', [file.stream.sha256], split_params)
             
-            with zipfile.ZipFile(zip_path, 'w') as zipf:
-                for output_file in output_files:
-                    zipf.write(output_file, os.path.basename(output_file))
+            if zip_path is None:
+                # Diviser le PDF, chaque partie étant envoyée dans le ZIP dès qu'elle est prête
+                parts = splitter.iter_split(source, **split_params)
+                return zip_stream_response(parts,
+                                           f"split_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                                           cache_key, [source])
             
-            # Nettoyer les fichiers temporaires
-            if os.path.exists(filepath):
-                os.remove(filepath)
-            for output_file in output_files:
-                if os.path.exists(output_file):
-                    os.remove(output_file)
-            if os.path.exists(output_dir):
-                os.rmdir(output_dir)
+            discard_upload(source)
             
             return send_file(zip_path, as_attachment=True, 
                            download_name=f"split_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
         
         except Exception as e:
             # Nettoyer en cas d'erreur
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            discard_upload(source)
             flash(f'Erreur lors de la division: {str(e)}')
             return redirect(request.url)
     
     flash('Fichier non valide. Seuls les fichiers PDF sont acceptés.')
     return redirect(request.url)
 
+# API asynchrone : soumission, suivi, résultat et annulation des jobs
+@app.route('/api/jobs', methods=['GET'])
+def jobs_stats():
+    return jsonify(job_manager.stats())
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    operation = request.form.get('operation', '')
+    field = 'files[]' if operation == 'merge' else 'file'
+    files = [file for file in request.files.getlist(field) if file and allowed_file(file.filename)]
+    
+    if not files:
+        return jsonify({'error': 'Aucun fichier PDF valide'}), 400
+    if operation == 'merge' and len(files) < 2:
+        request.discard_uploads()
+        return jsonify({'error': 'Au moins 2 fichiers PDF valides sont requis'}), 400
+    
+    job_manager.purge_expired()
+    
+    try:
+        params = parse_job_params(operation, request.form)
+        job = job_manager.create_job(operation, params)
+    except OverflowError as e:
+        request.discard_uploads()
+        return jsonify({'error': str(e)}), 429
+    except ValueError as e:
+        request.discard_uploads()
+        return jsonify({'error': str(e)}), 400
+    
+    # Déplacer les entrées dans le dossier du job (simple renommage, pas de copie)
+    input_paths = []
+    input_hashes = []
+    for i, file in enumerate(files if operation == 'merge' else files[:1]):
+        filepath = os.path.join(job.work_dir, f"input_{i:03d}_{secure_filename(file.filename)}")
+        if file.stream.path is None:
+            # Upload gardé en mémoire : le worker le relit depuis le dossier du job
+            with open(filepath, 'wb') as f:
+                f.write(file.stream.getvalue())
+        else:
+            os.replace(uploaded_path(file), filepath)
+        input_paths.append(filepath)
+        input_hashes.append(file.stream.sha256)
+    request.discard_uploads()
+    
+    if operation != 'info':
+        cache_operation, cache_params = job_cache_params(operation, params)
+        job.cache_key = ResultCache.make_key(cache_operation, input_hashes, cache_params)
+    
+    try:
+        job_manager.submit(job, input_paths)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    response = job.to_dict()
+    response['status_url'] = url_for('job_status', job_id=job.id)
+    response['result_url'] = url_for('job_result', job_id=job.id)
+    return jsonify(response), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job introuvable'}), 404
+    
+    response = job.to_dict()
+    response['queue_depth'] = job_manager.queue_depth()
+    return jsonify(response)
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job introuvable'}), 404
+    if job.status in ('queued', 'running'):
+        return jsonify(job.to_dict()), 202
+    if job.status != 'done':
+        return jsonify(job.to_dict()), 409
+    if job.result and 'info' in job.result:
+        return jsonify(job.result['info'])
+    
+    result_path = job_manager.result_path(job)
+    if result_path is None:
+        return jsonify({'error': 'Le résultat a expiré'}), 410
+    
+    extension = os.path.splitext(result_path)[1]
+    return send_file(result_path, as_attachment=True,
+                     download_name=f"{job.operation}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}")
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    if not job_manager.cancel(job_id):
+        return jsonify({'error': 'Job introuvable'}), 404
+    return jsonify(job_manager.get(job_id).to_dict())
+
+def parse_job_params(operation, form):
+    """Retourne les paramètres d'un job à partir des mêmes champs que les formulaires HTML"""
+    if operation == 'compress':
+        return parse_compress_params(form)
+    if operation == 'convert':
+        conversion_type = form.get('conversion_type', 'images')
+        if conversion_type not in ('images', 'word', 'text', 'layout'):
+            raise ValueError(f"Type de conversion non supporté: {conversion_type}")
+        params = {'conversion_type': conversion_type, 'format': form.get('format', 'PNG'), 'dpi': 150}
+        if conversion_type == 'layout':
+            params.update(parse_layout_params(form))
+        else:
+            params.update(parse_pages_params(form))
+        return params
+    if operation == 'split':
+        return parse_split_params(form)
+    if operation == 'merge':
+        return {'engine': form.get('engine', 'pymupdf')}
+    return {}
+
+def job_cache_params(operation, params):
+    """Aligne la clé de cache d'un job sur celle de la route HTML équivalente"""
+    if operation == 'convert':
+        pages_params = {'pages': params['pages']} if 'pages' in params else {}
+        if params['conversion_type'] == 'images':
+            return 'images', {'format': params['format'], 'dpi': params['dpi'], **pages_params}
+        if params['conversion_type'] == 'layout':
+            return 'layout', {**pages_params, 'compact': params['compact']}
+        return params['conversion_type'], pages_params or None
+    return operation, params
+
+def parse_compress_params(form):
+    """Valide les champs du formulaire de compression et retourne les paramètres normalisés"""
+    params = {
+        'quality': form.get('quality', 'medium'),
+        'engine': form.get('engine', app.config['COMPRESS_ENGINE'])
+    }
+    # Optimisation sans perte et traitement selon le contenu : toujours réalisés par PyMuPDF
+    if params['quality'] == 'optimize':
+        params['engine'] = 'pymupdf'
+    elif form.get('content_aware'):
+        params['content_aware'] = True
+        params['engine'] = 'pymupdf'
+    
+    # Mode taille cible : remplace le niveau de qualité
+    target_size_mb = form.get('target_size_mb', '').strip()
+    if target_size_mb:
+        target_size = int(float(target_size_mb) * 1024 * 1024)
+        if target_size <= 0:
+            raise ValueError("La taille cible doit être supérieure à 0")
+        params['target_size'] = target_size
+    
+    return params
+
+def parse_pages_params(form):
+    """Pages optionnelles d'une conversion, syntaxe de la division (aucun paramètre = tout le document)"""
+    pages_input = form.get('pages', '').strip()
+    if not pages_input:
+        return {}
+    return {'pages': parse_page_numbers(pages_input)}
+
+def parse_layout_params(form):
+    """Pages optionnelles et encodage (compact = en colonnes) de l'extraction de mise en page"""
+    params = parse_pages_params(form)
+    params['compact'] = bool(form.get('compact'))
+    return params
+
+def parse_split_params(form):
+    """Valide les champs du formulaire de division et retourne les paramètres normalisés"""
+    split_method = form.get('split_method', 'pages')
+    
+    if split_method == 'pages':
+        # Division par pages spécifiques
+        pages_input = form.get('pages', '')
+        if not pages_input:
+            raise ValueError("Veuillez spécifier les numéros de pages")
+        
+        # Parser les numéros de pages (ex: "1,3,5-8,10")
+        return {'method': split_method, 'pages': parse_page_numbers(pages_input)}
+    
+    if split_method == 'range':
+        # Division par plages
+        ranges_input = form.get('ranges', '')
+        if not ranges_input:
+            raise ValueError("Veuillez spécifier les plages de pages")
+        
+        return {'method': split_method, 'ranges': parse_page_ranges(ranges_input)}
+    
+    if split_method == 'every_n_pages':
+        # Division par groupes de N pages
+        n_pages = int(form.get('n_pages', 1))
+        if n_pages < 1:
+            raise ValueError("Le nombre de pages doit être supérieur à 0")
+        
+        return {'method': split_method, 'n_pages': n_pages}
+    
+    if split_method == 'bookmarks':
+        # Division par signets, au niveau de la table des matières choisi
+        level = int(form.get('level', 1))
+        if level < 1:
+            raise ValueError("Le niveau des signets doit être supérieur à 0")
+        
+        return {'method': split_method, 'level': level}
+    
+    raise ValueError(f"Méthode de division non supportée: {split_method}")
+
 def parse_page_numbers(pages_input):
     """Parse les numéros de pages depuis une chaîne (ex: '1,3,5-8,10')"""
     page_numbers = []
@@ -0,0 +1,77 @@
+# ================================
+# benchmarks/bench_merge.py - Comparaison des moteurs de fusion PDF
+# ================================
+#
+# Usage :
+#   python benchmarks/bench_merge.py                 # 25 PDF générés de 20 pages
+#   python benchmarks/bench_merge.py a.pdf b.pdf ... # fichiers fournis
+#
+# Chaque moteur tourne dans un processus séparé pour mesurer son pic de mémoire (RSS).
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import resource
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from services.pdf_merger import PDFMerger
+
+
+def generate_inputs(folder, count=25, pages=20):
+    """Génère des PDF de test partageant le même logo (ressource dupliquée entre fichiers)"""
+    logo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 300, 300), False)
+    logo.set_rect(logo.irect, (30, 90, 160))
+    logo_bytes = logo.tobytes("png")
+    
+    paths = []
+    for i in range(count):
+        pdf_document = fitz.open()
+        for page_num in range(pages):
+            page = pdf_document.new_page()
+            page.insert_text((72, 72), f"Document {i + 1} - page {page_num + 1}", fontsize=14)
+            page.insert_image(fitz.Rect(72, 100, 222, 250), stream=logo_bytes)
+        path = os.path.join(folder, f"input_{i + 1:03d}.pdf")
+        pdf_document.save(path)
+        pdf_document.close()
+        paths.append(path)
+    return paths
+
+
+def _run_engine(engine, input_files, output_path, queue):
+    """Exécute une fusion et renvoie (durée, pic RSS en Mo)"""
+    start = time.perf_counter()
+    PDFMerger().merge_pdfs(input_files, output_path, engine=engine)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss est en Ko sous Linux
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="bench_merge_")
+    try:
+        input_files = sys.argv[1:] or generate_inputs(workdir)
+        input_size = sum(os.path.getsize(path) for path in input_files)
+        print(f"{len(input_files)} fichiers, {input_size / (1024 * 1024):.2f} MB en entrée\n")
+        print(f"{'moteur':<10}{'durée (s)':>12}{'pic RSS (MB)':>16}{'sortie (MB)':>14}")
+        
+        for engine in PDFMerger().supported_engines:
+            output_path = os.path.join(workdir, f"merged_{engine}.pdf")
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_run_engine, args=(engine, input_files, output_path, queue))
+            process.start()
+            elapsed, peak_rss = queue.get()
+            process.join()
+            
+            output_size = os.path.getsize(output_path) / (1024 * 1024)
+            print(f"{engine:<10}{elapsed:>12.2f}{peak_rss:>16.1f}{output_size:>14.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# ================================
+# benchmarks/bench_startup.py - Démarrage et mémoire d'un worker selon les routes servies
+# ================================
+#
+# Usage :
+#   python benchmarks/bench_startup.py
+#
+# Chaque scénario tourne dans un interpréteur neuf (spawn) : import de app.py, puis une
+# requête éventuelle. Sont mesurés la durée de l'import, la durée de la première requête
+# (imports différés compris), le pic RSS et le nombre de modules chargés.
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import resource
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (nom, route, champs du formulaire) ; route None = import seul, 'warm_up' = préchargement
+SCENARIOS = [
+    ('import', None, None),
+    ('/info', '/info', {}),
+    ('/merge', '/merge', {}),
+    ('/convert word', '/convert', {'conversion_type': 'word'}),
+    ('warm-up', 'warm_up', None),
+]
+
+
+def generate_input(folder, pages=3):
+    """Génère un petit PDF de test (fitz importé ici : les scénarios partent d'un processus vierge)"""
+    import fitz  # PyMuPDF
+    pdf_document = fitz.open()
+    for page_num in range(pages):
+        pdf_document.new_page().insert_text((72, 72), f"Page {page_num + 1}", fontsize=14)
+    path = os.path.join(folder, 'input.pdf')
+    pdf_document.save(path)
+    pdf_document.close()
+    return path
+
+
+def _run_scenario(route, form, pdf_path, workdir, queue):
+    """Importe l'application puis sert une requête ; renvoie les mesures au processus parent"""
+    # Les dossiers de travail de l'application sont créés dans le dossier courant
+    os.chdir(workdir)
+    start = time.perf_counter()
+    import app
+    import_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    if route == 'warm_up':
+        app.service_registry.warm_up()
+    elif route is not None:
+        files = [(open(pdf_path, 'rb'), 'input.pdf')]
+        if route == '/merge':
+            data = {**form, 'files[]': files + [(open(pdf_path, 'rb'), 'input.pdf')]}
+        else:
+            data = {**form, 'file': files[0]}
+        response = app.app.test_client().post(route, data=data, content_type='multipart/form-data')
+        if response.status_code != 200:
+            raise RuntimeError(f"{route}: statut {response.status_code}")
+    request_time = time.perf_counter() - start
+    
+    # ru_maxrss est en Ko sous Linux
+    queue.put((import_time, request_time, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+               len(sys.modules)))
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    context = multiprocessing.get_context('spawn')
+    try:
+        pdf_path = generate_input(workdir)
+        print(f"{'scénario':<16}{'import (s)':>12}{'requête (s)':>14}{'pic RSS (MB)':>16}{'modules':>10}")
+        
+        for name, route, form in SCENARIOS:
+            queue = context.Queue()
+            process = context.Process(target=_run_scenario, args=(route, form, pdf_path, workdir, queue))
+            process.start()
+            import_time, request_time, peak_rss, modules = queue.get()
+            process.join()
+            print(f"{name:<16}{import_time:>12.2f}{request_time:>14.2f}{peak_rss:>16.1f}{modules:>10}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
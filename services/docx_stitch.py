@@ -0,0 +1,114 @@
+# ================================
+# services/docx_stitch.py - Assemblage de documents Word produits par morceaux
+# ================================
+
+import io
+import re
+import copy
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.opc.part import Part
+
+# Attributs qui référencent une relation de la partie document (images, liens)
+_RELATIONSHIP_NAMESPACE = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+
+def stitch_docx(docx_paths, output_path=None):
+    """
+    Assemble des documents Word dans l'ordre en un seul document
+    
+    Le premier document sert de base (styles, numérotation, paramètres) : tous les morceaux
+    sont produits par pdf2docx avec le même modèle. Les propriétés de la dernière section de
+    chaque morceau deviennent un saut de section, pour que chaque page garde ses marges.
+    
+    Args:
+        docx_paths: Chemins des documents à assembler, dans l'ordre
+        output_path: Chemin du document assemblé (None = retourner les octets)
+    
+    Returns:
+        bool ou bytes: True, ou le contenu du document si output_path est None
+    """
+    document = Document(docx_paths[0])
+    body = document.element.body
+    
+    for docx_path in docx_paths[1:]:
+        _close_section(body)
+        part = Document(docx_path)
+        relationship_ids, copied_parts = {}, {}
+        # Le sectPr du morceau, copié en dernier, devient celui de la section finale
+        for element in part.element.body:
+            element = copy.deepcopy(element)
+            _rebind_relationships(element, part.part, document.part, relationship_ids, copied_parts)
+            body.append(element)
+    
+    if output_path is None:
+        buffer = io.BytesIO()
+        document.save(buffer)
+        return buffer.getvalue()
+    document.save(output_path)
+    return True
+
+
+def _close_section(body):
+    """Transforme la section finale du corps en saut de section (paragraphe porteur du sectPr)"""
+    sect_pr = body.sectPr
+    if sect_pr is None:
+        return
+    paragraph = OxmlElement('w:p')
+    paragraph_properties = OxmlElement('w:pPr')
+    paragraph.append(paragraph_properties)
+    sect_pr.addprevious(paragraph)
+    paragraph_properties.append(sect_pr)
+
+
+def _rebind_relationships(element, source_part, target_part, relationship_ids, copied_parts):
+    """
+    Recrée dans le document assemblé les relations utilisées par un élément copié
+    
+    Les images sont ajoutées par contenu (une même image n'est stockée qu'une fois), les
+    liens externes sont recréés à l'identique et toute autre partie référencée (en-tête,
+    graphique, objet incorporé...) est copiée avec les parties dont elle dépend.
+    """
+    for node in element.iter():
+        for name, value in node.attrib.items():
+            if not name.startswith(_RELATIONSHIP_NAMESPACE) or value not in source_part.rels:
+                continue
+            if value not in relationship_ids:
+                relationship = source_part.rels[value]
+                if relationship.is_external:
+                    relationship_ids[value] = target_part.relate_to(relationship.target_ref,
+                                                                    relationship.reltype, is_external=True)
+                elif relationship.reltype == RT.IMAGE:
+                    relationship_ids[value] = target_part.get_or_add_image(
+                        io.BytesIO(relationship.target_part.blob))[0]
+                else:
+                    relationship_ids[value] = target_part.relate_to(
+                        _copy_part(relationship.target_part, target_part.package, copied_parts),
+                        relationship.reltype)
+            node.set(name, relationship_ids[value])
+
+
+def _copy_part(part, package, copied_parts):
+    """Copie une partie et, récursivement, ses relations (mêmes identifiants) dans le paquet assemblé"""
+    if part in copied_parts:
+        return copied_parts[part]
+    
+    # '/word/header2.xml' -> premier nom libre parmi '/word/header1.xml', '/word/header2.xml'...
+    template = re.sub(r'\d*(\.\w+)$', r'%d\1', part.partname)
+    used = {str(existing.partname) for existing in package.iter_parts()}
+    used.update(str(copied.partname) for copied in copied_parts.values())
+    index = 1
+    while template % index in used:
+        index += 1
+    
+    duplicate = Part(PackURI(template % index), part.content_type, part.blob, package)
+    copied_parts[part] = duplicate
+    for rId, relationship in part.rels.items():
+        if relationship.is_external:
+            duplicate.rels.add_relationship(relationship.reltype, relationship.target_ref, rId, is_external=True)
+        else:
+            duplicate.rels.add_relationship(relationship.reltype,
+                                            _copy_part(relationship.target_part, package, copied_parts), rId)
+    return duplicate
@@ -0,0 +1,302 @@
+# ================================
+# services/ghostscript_pool.py - Pool d'interpréteurs Ghostscript persistants
+# ================================
+
+import os
+import queue
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+
+# Marqueurs écrits par l'interpréteur à la fin de chaque travail
+DONE_MARKER = b'%%GSPOOL-DONE'
+ERROR_MARKER = b'%%GSPOOL-ERROR'
+
+_ghostscript_path = None
+_ghostscript_detected = False
+_detect_lock = threading.Lock()
+
+
+def find_ghostscript():
+    """
+    Détecte l'exécutable Ghostscript une seule fois par processus
+    
+    Returns:
+        str ou None: Chemin de l'exécutable, ou None si Ghostscript n'est pas installé
+    """
+    global _ghostscript_path, _ghostscript_detected
+    with _detect_lock:
+        if not _ghostscript_detected:
+            path = shutil.which('gs')
+            if path and _runs(path):
+                _ghostscript_path = path
+            _ghostscript_detected = True
+    return _ghostscript_path
+
+
+def _runs(path):
+    """Vérifie que l'exécutable répond à --version"""
+    try:
+        subprocess.run([path, '--version'], capture_output=True, check=True, timeout=10)
+        return True
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+        return False
+
+
+def ps_string(value):
+    """Chaîne PostScript littérale (parenthèses et barres obliques inverses échappées)"""
+    escaped = value.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return f'({escaped})'
+
+
+def ps_value(value):
+    """Convertit un paramètre Python en valeur PostScript ('/Nom' reste un nom)"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str) and value.startswith('/'):
+        return value
+    return ps_string(str(value))
+
+
+class GhostscriptError(RuntimeError):
+    """Échec d'un travail exécuté par un interpréteur du pool"""
+
+
+class GhostscriptInterpreter:
+    """Interpréteur Ghostscript de longue durée piloté par son entrée standard"""
+    
+    def __init__(self, executable, allowed_dirs):
+        self.executable = executable
+        self.allowed_dirs = allowed_dirs
+        self.process = None
+        self.jobs_done = 0
+        self.last_used = 0.0
+    
+    def start(self):
+        """Lance l'interpréteur (polices et ressources initialisées une seule fois)"""
+        # -dSAFER reste actif : seuls les dossiers de travail sont accessibles
+        permits = []
+        for folder in self.allowed_dirs:
+            folder = os.path.join(os.path.abspath(folder), '')
+            permits.extend([f'--permit-file-read={folder}', f'--permit-file-write={folder}'])
+        
+        self.process = subprocess.Popen(
+            [self.executable, '-q', '-dNOPAUSE', '-dSAFER', '-dNODISPLAY', *permits, '-'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        self.jobs_done = 0
+        self.last_used = time.time()
+    
+    def stop(self):
+        """Arrête l'interpréteur"""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            stream.close()
+        self.process = None
+    
+    def restart(self):
+        self.stop()
+        self.start()
+    
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+    
+    def ping(self, timeout=10):
+        """Vérifie que l'interpréteur répond (contrôle de santé)"""
+        try:
+            self.run('', timeout)
+            return True
+        except (GhostscriptError, subprocess.TimeoutExpired):
+            return False
+    
+    def run(self, program, timeout):
+        """
+        Exécute un programme PostScript et attend son marqueur de fin
+        
+        Args:
+            program: Code PostScript du travail
+            timeout: Durée maximale en secondes
+        
+        Returns:
+            str: Messages produits par Ghostscript pendant le travail
+        """
+        if not self.is_alive():
+            raise GhostscriptError("L'interpréteur Ghostscript n'est pas démarré")
+        
+        # stopped intercepte les erreurs PostScript : l'interpréteur reste utilisable
+        job = (f"{{ {program}\n}} stopped nulldevice\n"
+               f"{{ (\\n{ERROR_MARKER.decode()} ) print $error /errorname get == }} "
+               f"{{ (\\n{DONE_MARKER.decode()}\\n) print }} ifelse flush clear cleardictstack\n")
+        try:
+            self.process.stdin.write(job.encode())
+            self.process.stdin.flush()
+        except OSError as e:
+            raise GhostscriptError(f"L'interpréteur Ghostscript ne répond plus: {str(e)}")
+        
+        output = self._read_until_marker(time.monotonic() + timeout)
+        self.jobs_done += 1
+        self.last_used = time.time()
+        
+        if ERROR_MARKER in output:
+            log, error = output.rsplit(ERROR_MARKER, 1)
+            raise GhostscriptError(f"Erreur Ghostscript {error.decode(errors='replace').strip()}: "
+                                   f"{log.decode(errors='replace').strip()}")
+        return output.rsplit(DONE_MARKER, 1)[0].decode(errors='replace').strip()
+    
+    def _read_until_marker(self, deadline):
+        """Lit la sortie de l'interpréteur jusqu'à un marqueur de fin, dans le délai imparti"""
+        fd = self.process.stdout.fileno()
+        output = b''
+        while DONE_MARKER not in output and not self._has_error_line(output):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self.executable, None)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise GhostscriptError(f"L'interpréteur Ghostscript s'est arrêté: {output.decode(errors='replace')}")
+            output += chunk
+        return output
+    
+    @staticmethod
+    def _has_error_line(output):
+        """Le marqueur d'erreur est suivi du nom de l'erreur sur la même ligne"""
+        index = output.rfind(ERROR_MARKER)
+        return index >= 0 and b'\n' in output[index:]
+
+
+class GhostscriptPool:
+    """Pool d'interpréteurs Ghostscript chauds, réutilisés d'une requête à l'autre"""
+    
+    def __init__(self, size=2, max_jobs_per_interpreter=100, timeout=60, allowed_dirs=None,
+                 health_check_interval=30, executable=None):
+        self.executable = executable or find_ghostscript()
+        if self.executable is None:
+            raise RuntimeError("Ghostscript n'est pas installé sur le système")
+        
+        self.size = size
+        self.max_jobs_per_interpreter = max_jobs_per_interpreter
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.allowed_dirs = list(allowed_dirs or [os.getcwd()])
+        # Dossier des entrées en mémoire et des sorties à relire (accessible en mode SAFER)
+        self.work_dir = tempfile.mkdtemp(prefix='gspool_')
+        self.allowed_dirs.append(self.work_dir)
+        self.restarts = 0
+        self.jobs = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._interpreters = []
+        
+        # Démarrage immédiat : l'initialisation de Ghostscript se fait hors des requêtes
+        for _ in range(size):
+            interpreter = GhostscriptInterpreter(self.executable, self.allowed_dirs)
+            interpreter.start()
+            self._interpreters.append(interpreter)
+            self._idle.put(interpreter)
+    
+    def run_pdfwrite(self, input_path, output_path, distiller_params, timeout=None):
+        """
+        Réécrit un PDF avec le périphérique pdfwrite d'un interpréteur du pool
+        
+        Args:
+            input_path: Chemin du fichier PDF source
+            output_path: Chemin du fichier produit
+            distiller_params: Paramètres pdfwrite ({'ColorImageResolution': 150, ...})
+            timeout: Durée maximale du travail (self.timeout par défaut)
+        """
+        params = ' '.join(f"/{name} {ps_value(value)}" for name, value in distiller_params.items())
+        program = (f"mark /OutputFile {ps_string(os.path.abspath(output_path))} "
+                   f"/pdfwrite finddevice putdeviceprops setdevice\n"
+                   f"<< {params} >> setdistillerparams\n"
+                   f"{ps_string(os.path.abspath(input_path))} run")
+        
+        interpreter = self._acquire()
+        try:
+            interpreter.run(program, timeout or self.timeout)
+        except (GhostscriptError, subprocess.TimeoutExpired):
+            # Un interpréteur en erreur ou bloqué n'est pas réutilisé tel quel
+            with self._lock:
+                self.failures += 1
+            self._restart(interpreter)
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        finally:
+            with self._lock:
+                self.jobs += 1
+            self._release(interpreter)
+        
+        if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            raise GhostscriptError("Le fichier compressé n'a pas été créé")
+    
+    def run_pdfwrite_bytes(self, data, distiller_params, timeout=None):
+        """Variante en mémoire : l'entrée et la sortie transitent par le dossier de travail du pool"""
+        job_id = uuid.uuid4().hex
+        input_path = os.path.join(self.work_dir, f"{job_id}_in.pdf")
+        output_path = os.path.join(self.work_dir, f"{job_id}_out.pdf")
+        try:
+            with open(input_path, 'wb') as f:
+                f.write(data)
+            self.run_pdfwrite(input_path, output_path, distiller_params, timeout)
+            with open(output_path, 'rb') as f:
+                return f.read()
+        finally:
+            for path in (input_path, output_path):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    def stats(self):
+        """Retourne l'état du pool"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': self._idle.qsize(),
+                'alive': sum(1 for interpreter in self._interpreters if interpreter.is_alive()),
+                'jobs': self.jobs,
+                'failures': self.failures,
+                'restarts': self.restarts
+            }
+    
+    def shutdown(self):
+        """Arrête tous les interpréteurs"""
+        for interpreter in self._interpreters:
+            interpreter.stop()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+    
+    def _acquire(self):
+        """Prend un interpréteur libre et vérifie qu'il est en état de servir"""
+        interpreter = self._idle.get()
+        try:
+            if not interpreter.is_alive() or interpreter.jobs_done >= self.max_jobs_per_interpreter:
+                self._restart(interpreter)
+            elif time.time() - interpreter.last_used > self.health_check_interval and not interpreter.ping():
+                self._restart(interpreter)
+        except Exception:
+            self._idle.put(interpreter)
+            raise
+        return interpreter
+    
+    def _release(self, interpreter):
+        # Recycler après N travaux pour borner la mémoire de l'interpréteur
+        if interpreter.jobs_done >= self.max_jobs_per_interpreter:
+            self._restart(interpreter)
+        self._idle.put(interpreter)
+    
+    def _restart(self, interpreter):
+        with self._lock:
+            self.restarts += 1
+        interpreter.restart()
@@ -0,0 +1,85 @@
+# ================================
+# services/incompressible_registry.py - Documents sans gain de compression
+# ================================
+
+import os
+import json
+import threading
+from collections import OrderedDict
+
+
+class IncompressibleRegistry:
+    """
+    Registre persistant des documents que la compression n'a pas réussi à réduire
+    
+    Un échec ne vaut que pour le même document, le même moteur et le même niveau : la taille
+    produite ne varie pas de façon monotone avec le niveau (Ghostscript comme PyMuPDF peuvent
+    produire un fichier plus léger à un niveau « plus doux », selon leur traitement des images).
+    """
+    
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self._entries = OrderedDict()  # "empreinte:moteur:niveau" -> True
+        self._lock = threading.Lock()
+        self._load()
+    
+    def is_incompressible(self, sha256, engine, quality):
+        """
+        Indique si le document a déjà été trouvé incompressible avec ce moteur à ce niveau
+        
+        Args:
+            sha256: Empreinte du document
+            engine: Moteur de compression demandé
+            quality: Niveau de qualité demandé
+        """
+        key = self._key(sha256, engine, quality)
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+    
+    def record(self, sha256, engine, quality):
+        """Enregistre un document pour lequel la compression n'a apporté aucun gain"""
+        key = self._key(sha256, engine, quality)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = True
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+    
+    @staticmethod
+    def _key(sha256, engine, quality):
+        return f"{sha256}:{engine}:{quality}"
+    
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits}
+    
+    def _load(self):
+        """Relit le registre enregistré (ignoré s'il est absent ou illisible)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(entries, dict):
+            return
+        for key, value in entries.items():
+            # Ancien format "empreinte:moteur" -> niveau : seul ce niveau exact est repris
+            if key.count(':') == 1 and isinstance(value, str):
+                key = f"{key}:{value}"
+            self._entries[key] = True
+    
+    def _save(self):
+        """Écrit le registre de façon atomique"""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,414 @@
+# ================================
+# services/job_manager.py - Exécution asynchrone des traitements PDF
+# ================================
+
+import os
+import json
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from concurrent.futures.process import BrokenProcessPool
+
+SUPPORTED_OPERATIONS = ['compress', 'convert', 'split', 'merge', 'info']
+
+# Progression écrite par le worker dans le dossier du job, relue par le processus principal
+PROGRESS_FILE = 'progress.json'
+
+
+def run_operation(operation, input_paths, output_dir, params, checkpoint_dir=None):
+    """
+    Exécute une opération PDF dans un processus worker
+    
+    Args:
+        operation: Nom de l'opération ('compress', 'convert', 'split', 'merge', 'info')
+        input_paths: Liste des chemins des fichiers d'entrée
+        output_dir: Dossier de travail du job
+        params: Paramètres de l'opération
+        checkpoint_dir: Dossier de reprise de la conversion Word (conservé si le job échoue)
+    
+    Returns:
+        dict: {'path': chemin de l'artefact} (et 'pages' en compression selon le contenu)
+              ou {'info': informations du PDF}
+    """
+    # Imports locaux : le processus worker ne charge que ce dont il a besoin
+    if operation == 'compress':
+        from services.pdf_compressor import PDFCompressor
+        output_path = os.path.join(output_dir, 'compressed.pdf')
+        compressor = PDFCompressor()
+        compressor.compress_pdf(input_paths[0], output_path, params.get('quality', 'medium'),
+                                engine=params.get('engine'), target_size=params.get('target_size'),
+                                content_aware=params.get('content_aware', False))
+        if 'pages' in compressor.last_report:
+            return {'path': output_path, 'pages': compressor.last_report['pages']}
+        return {'path': output_path}
+    
+    if operation == 'merge':
+        from services.pdf_merger import PDFMerger
+        output_path = os.path.join(output_dir, 'merged.pdf')
+        PDFMerger().merge_pdfs(input_paths, output_path, engine=params.get('engine'))
+        return {'path': output_path}
+    
+    if operation == 'info':
+        from services.pdf_converter import PDFConverter
+        return {'info': PDFConverter().get_pdf_info(input_paths[0])}
+    
+    if operation == 'convert':
+        from services.pdf_converter import PDFConverter
+        converter = PDFConverter()
+        conversion_type = params.get('conversion_type', 'images')
+        
+        if conversion_type == 'images':
+            images_dir = os.path.join(output_dir, 'images')
+            image_paths = converter.pdf_to_images(input_paths[0], images_dir, params.get('format', 'PNG'),
+                                                  params.get('dpi', 150), pages=params.get('pages'))
+            return {'path': _zip_files(image_paths, os.path.join(output_dir, 'images.zip'))}
+        if conversion_type == 'word':
+            output_path = os.path.join(output_dir, 'converted.docx')
+            converter.pdf_to_word(input_paths[0], output_path, params.get('pages'),
+                                  checkpoint_dir=checkpoint_dir, progress=_progress_recorder(output_dir))
+            return {'path': output_path}
+        if conversion_type == 'text':
+            output_path = os.path.join(output_dir, 'extracted_text.txt')
+            converter.pdf_to_text(input_paths[0], output_path, params.get('pages'))
+            return {'path': output_path}
+        if conversion_type == 'layout':
+            output_path = os.path.join(output_dir, 'layout.jsonl')
+            converter.pdf_to_layout(input_paths[0], output_path, params.get('pages'), params.get('compact', False))
+            return {'path': output_path}
+        raise ValueError(f"Type de conversion non supporté: {conversion_type}")
+    
+    if operation == 'split':
+        from services.pdf_splitter import PDFSplitter
+        splitter = PDFSplitter()
+        split_dir = os.path.join(output_dir, 'split')
+        method = params.get('method')
+        
+        if method == 'pages':
+            output_files = splitter.split_by_pages(input_paths[0], split_dir, params['pages'])
+        elif method == 'range':
+            output_files = splitter.split_by_range(input_paths[0], split_dir, params['ranges'])
+        elif method == 'every_n_pages':
+            output_files = splitter.split_every_n_pages(input_paths[0], split_dir, params['n_pages'])
+        elif method == 'bookmarks':
+            output_files = splitter.split_by_bookmarks(input_paths[0], split_dir, params.get('level', 1))
+        else:
+            raise ValueError(f"Méthode de division non supportée: {method}")
+        return {'path': _zip_files(output_files, os.path.join(output_dir, 'split.zip'))}
+    
+    raise ValueError(f"Opération non supportée: {operation}. Utilisez: {SUPPORTED_OPERATIONS}")
+
+
+def _progress_recorder(output_dir):
+    """Fonction de progression qui écrit (pages faites, pages totales) dans le dossier du job"""
+    progress_path = os.path.join(output_dir, PROGRESS_FILE)
+    
+    def record(pages_done, pages_total):
+        with open(f"{progress_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({'pages_done': pages_done, 'pages_total': pages_total}, f)
+        os.replace(f"{progress_path}.tmp", progress_path)
+    return record
+
+
+def _read_progress(output_dir):
+    """Dernière progression écrite par le worker (None si aucune)"""
+    try:
+        with open(os.path.join(output_dir, PROGRESS_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _zip_files(paths, zip_path):
+    """Regroupe des fichiers dans une archive ZIP et supprime les originaux"""
+    with zipfile.ZipFile(zip_path, 'w') as zipf:
+        for path in paths:
+            zipf.write(path, os.path.basename(path))
+            os.remove(path)
+    return zip_path
+
+
+class Job:
+    """État d'un traitement soumis au gestionnaire"""
+    
+    def __init__(self, job_id, operation, params, work_dir, cache_key=None):
+        self.id = job_id
+        self.operation = operation
+        self.params = params
+        self.work_dir = work_dir
+        self.cache_key = cache_key
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.future = None
+        self.cancel_requested = False
+    
+    def to_dict(self):
+        data = {
+            'job_id': self.id,
+            'operation': self.operation,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if self.error:
+            data['error'] = self.error
+        if self.result and 'info' in self.result:
+            data['info'] = self.result['info']
+        if self.result and 'pages' in self.result:
+            data['pages'] = self.result['pages']
+        if self.status in ('queued', 'running'):
+            progress = _read_progress(self.work_dir)
+            if progress is not None:
+                data['progress'] = progress
+        return data
+
+
+class JobManager:
+    """Gestionnaire de jobs asynchrones exécutés dans un pool de processus"""
+    
+    def __init__(self, jobs_dir, max_workers=None, max_tasks_per_worker=20, max_queue=100, result_cache=None,
+                 checkpoint_max_age=86400):
+        self.jobs_dir = jobs_dir
+        # Lots déjà convertis par un job interrompu, indexés par clé de cache (hors dossiers des jobs)
+        self.checkpoints_dir = os.path.join(jobs_dir, 'checkpoints')
+        self.checkpoint_max_age = checkpoint_max_age
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_queue = max_queue
+        self.result_cache = result_cache
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        
+        os.makedirs(self.checkpoints_dir, exist_ok=True)
+    
+    def create_job(self, operation, params=None, cache_key=None):
+        """
+        Prépare un job et son dossier de travail (les entrées y sont déposées avant submit)
+        
+        Args:
+            operation: Nom de l'opération
+            params: Paramètres de l'opération
+            cache_key: Clé du cache de résultats (optionnelle)
+        
+        Returns:
+            Job: Le job créé, à l'état 'queued'
+        """
+        if operation not in SUPPORTED_OPERATIONS:
+            raise ValueError(f"Opération non supportée: {operation}. Utilisez: {SUPPORTED_OPERATIONS}")
+        
+        if self.queue_depth() >= self.max_queue:
+            raise OverflowError("La file d'attente est pleine, réessayez plus tard")
+        
+        job_id = str(uuid.uuid4())
+        work_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(work_dir, exist_ok=True)
+        job = Job(job_id, operation, params or {}, work_dir, cache_key)
+        
+        with self._lock:
+            self._jobs[job_id] = job
+        return job
+    
+    def submit(self, job, input_paths):
+        """
+        Soumet un job au pool ; retourne immédiatement
+        
+        Args:
+            job: Job créé par create_job
+            input_paths: Chemins des fichiers d'entrée (dans job.work_dir)
+        """
+        # Un résultat identique est peut-être déjà en cache
+        if self.result_cache is not None and job.cache_key:
+            cached_path = self.result_cache.get(job.cache_key)
+            if cached_path is not None:
+                self._finish(job, 'done', result={'path': cached_path})
+                return job
+        
+        # Un pool cassé (worker tué : mémoire, plantage de MuPDF) est remplacé une fois
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                job.future = executor.submit(run_operation, job.operation, input_paths,
+                                             job.work_dir, job.params, self.checkpoint_dir(job.cache_key))
+                break
+            except BrokenProcessPool as e:
+                self._discard_executor(executor)
+                if attempt == 1:
+                    self._finish(job, 'failed', error=str(e))
+                    raise RuntimeError(f"Erreur lors de la soumission du job: {str(e)}")
+        job.future.add_done_callback(lambda future: self._on_done(job, future, executor))
+        return job
+    
+    def checkpoint_dir(self, cache_key):
+        """
+        Dossier de reprise d'un traitement : la même clé de cache (même entrée, mêmes
+        paramètres) retrouve les lots terminés par une tentative précédente
+        
+        Returns:
+            str ou None: Chemin du dossier (créé à la demande), ou None sans clé de cache
+        """
+        if not cache_key:
+            return None
+        return os.path.join(self.checkpoints_dir, cache_key)
+    
+    def get(self, job_id):
+        """Retourne le job correspondant ou None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and job.status == 'queued' and job.future is not None and job.future.running():
+            job.status = 'running'
+            job.started_at = job.started_at or time.time()
+        return job
+    
+    def cancel(self, job_id):
+        """
+        Annule un job : immédiatement s'il est en attente, à la fin de son exécution sinon
+        
+        Returns:
+            bool: True si le job existait
+        """
+        job = self.get(job_id)
+        if job is None:
+            return False
+        
+        if job.status in ('done', 'failed', 'cancelled'):
+            return True
+        
+        job.cancel_requested = True
+        if job.future is not None and job.future.cancel():
+            self._finish(job, 'cancelled')
+        return True
+    
+    def result_path(self, job):
+        """Retourne le chemin de l'artefact d'un job terminé (ou None)"""
+        if job.status != 'done' or not job.result or 'path' not in job.result:
+            return None
+        path = job.result['path']
+        return path if os.path.exists(path) else None
+    
+    def queue_depth(self):
+        """Nombre de jobs en attente d'un worker"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sum(1 for job in jobs if job.status == 'queued'
+                   and not (job.future is not None and job.future.running()))
+    
+    def stats(self):
+        """Retourne l'état du pool et de la file"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        
+        counts = {}
+        for job in jobs:
+            status = 'running' if job.status == 'queued' and job.future is not None and job.future.running() \
+                else job.status
+            counts[status] = counts.get(status, 0) + 1
+        
+        return {
+            'workers': self.max_workers,
+            'max_tasks_per_worker': self.max_tasks_per_worker,
+            'max_queue': self.max_queue,
+            'queue_depth': counts.get('queued', 0),
+            'jobs': counts
+        }
+    
+    def purge_expired(self, max_age=3600):
+        """Supprime les jobs terminés depuis plus de max_age secondes"""
+        now = time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished_at is not None and now - job.finished_at > max_age]
+            for job in expired:
+                del self._jobs[job.id]
+        
+        for job in expired:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+        
+        # Points de reprise abandonnés (aucune nouvelle tentative depuis checkpoint_max_age) ;
+        # le verrou d'un dossier n'est retiré qu'avec lui
+        for name in os.listdir(self.checkpoints_dir):
+            path = os.path.join(self.checkpoints_dir, name)
+            try:
+                if now - os.path.getmtime(path) <= self.checkpoint_max_age:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif name.endswith('.lock') and not os.path.exists(path[:-len('.lock')]):
+                    os.remove(path)
+            except OSError:
+                pass
+    
+    def shutdown(self):
+        """Arrête le pool de processus"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def _get_executor(self):
+        """Crée le pool au premier job (pas de processus lancés à l'import)"""
+        with self._lock:
+            if self._executor is None:
+                # max_tasks_per_child recycle les workers pour récupérer la mémoire perdue
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     max_tasks_per_child=self.max_tasks_per_worker)
+            return self._executor
+    
+    def _discard_executor(self, executor):
+        """Abandonne un pool cassé : le prochain job en crée un nouveau"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+    
+    def _on_done(self, job, future, executor):
+        """Callback appelé dans le processus principal à la fin d'un job"""
+        if job.status == 'cancelled':
+            return
+        
+        try:
+            result = future.result()
+        except CancelledError:
+            self._finish(job, 'cancelled')
+            return
+        except BrokenProcessPool as e:
+            # Tous les jobs du pool échouent avec lui ; les suivants partent sur un pool neuf
+            self._discard_executor(executor)
+            self._finish(job, 'failed', error=str(e))
+            return
+        except Exception as e:
+            self._finish(job, 'failed', error=str(e))
+            return
+        
+        if job.cancel_requested:
+            self._finish(job, 'cancelled')
+            return
+        
+        if self.result_cache is not None and job.cache_key and 'path' in result:
+            result['path'] = self.result_cache.put(job.cache_key, result['path'])
+        self._finish(job, 'done', result=result)
+    
+    def _finish(self, job, status, result=None, error=None):
+        """Fige l'état final d'un job et libère ses fichiers intermédiaires"""
+        job.started_at = job.started_at or time.time()
+        job.finished_at = time.time()
+        job.result = result
+        job.error = error
+        job.status = status
+        
+        # Conserver uniquement l'artefact produit dans le dossier du job
+        keep = result.get('path') if result else None
+        for filename in os.listdir(job.work_dir) if os.path.isdir(job.work_dir) else []:
+            path = os.path.join(job.work_dir, filename)
+            if path == keep:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
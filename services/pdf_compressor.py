@@ -2,148 +2,1136 @@
 # services/pdf_compressor.py - Service de compression PDF
 # ================================
 
+import io
 import os
+import math
+import zlib
+import shutil
+import hashlib
+import time
 import subprocess
 import tempfile
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import fitz  # PyMuPDF
+from PIL import Image, ImageChops
+from services.pdf_source import check_source, is_in_memory, open_pdf, source_size
+from services.ghostscript_pool import find_ghostscript
+from services.pdf_optimizer import PDFOptimizer
 
 class PDFCompressor:
     """Service pour compresser des fichiers PDF"""
     
-    def __init__(self):
+    def __init__(self, pool=None, timeout=60, chunk_min_pages=100, max_workers=None, engine='ghostscript',
+                 deduplicate=True):
+        # 'ghostscript' (processus externe, par défaut) ou 'pymupdf' (dans le processus, sans dépendance système)
+        self.supported_engines = ['ghostscript', 'pymupdf']
+        self.engine = engine
+        # Résumé de la dernière compression (moteur, tailles, durée)
+        self.last_report = None
+        # Réécriture sans perte : niveau 'optimize' et étape finale du moteur PyMuPDF
+        # (et du réassemblage des tranches), images et polices répétées fusionnées
+        self.optimizer = PDFOptimizer(deduplicate=deduplicate)
+        self.lossless_quality = 'optimize'
+        # Pool d'interpréteurs Ghostscript chauds (optionnel, un processus gs par appel sinon)
+        self.pool = pool
+        self.timeout = timeout
+        # Au-delà de chunk_min_pages, le document est compressé par tranches en parallèle
+        self.chunk_min_pages = chunk_min_pages
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Mode taille cible : réglages (dpi, qualité JPEG) du plus fidèle au plus compressé,
+        # None = images inchangées ; estimations sur les images les plus lourdes
+        self.target_candidates = [None, (300, 85), (300, 75), (200, 80), (200, 70), (150, 70), (150, 60),
+                                  (120, 60), (96, 55), (72, 50), (72, 40), (50, 35)]
+        self.target_sample_images = 6
+        # Compression selon le contenu : part de la page couverte d'images en deçà de laquelle
+        # la page est vectorielle, densité de texte (caractères pour 1000 pt²) d'une page de texte
+        # illustrée, part de pixels quasi noirs ou blancs d'un scan noir et blanc
+        self.image_page_coverage = 0.15
+        self.text_page_density = 2.0
+        self.bilevel_ratio = 0.95
+        # Espaces colorimétriques inutiles : images RVB dont les canaux ne s'écartent pas de plus
+        # de gray_tolerance (pour gray_ratio des pixels) ; images plus petites que colour_min_bytes ignorées
+        self.gray_tolerance = 16
+        self.gray_ratio = 0.99
+        self.colour_min_bytes = 32 * 1024
+        # Paramètres pdfwrite par qualité : passés en -d au processus gs ou en setdistillerparams au pool
         self.quality_settings = {
             'low': {
+                # Compression maximale : préréglage /screen (appliqué en premier), résolutions explicites
                 'dpi': 72,
-                'gs_options': ['-dPDFSETTINGS=/screen', '-dCompatibilityLevel=1.4']
+                'jpeg_quality': 50,
+                'mono_dpi': 200,
+                'distiller_params': {
+                    'PDFSETTINGS': '/screen',
+                    'CompatibilityLevel': 1.4,
+                    'DownsampleColorImages': True,
+                    'ColorImageDownsampleType': '/Average',
+                    'ColorImageResolution': 72,
+                    'DownsampleGrayImages': True,
+                    'GrayImageDownsampleType': '/Average',
+                    'GrayImageResolution': 72,
+                    'DownsampleMonoImages': True,
+                    'MonoImageDownsampleType': '/Subsample',
+                    'MonoImageResolution': 300,
+                    'CompressFonts': True,
+                    'SubsetFonts': True,
+                    'Optimize': True
+                }
             },
             'medium': {
+                # Compression équilibrée
                 'dpi': 150,
-                'gs_options': ['-dPDFSETTINGS=/ebook', '-dCompatibilityLevel=1.4']
+                'jpeg_quality': 70,
+                'mono_dpi': 300,
+                'distiller_params': {
+                    'CompatibilityLevel': 1.4,
+                    'ColorImageDownsampleType': '/Bicubic',
+                    'ColorImageResolution': 150,
+                    'GrayImageDownsampleType': '/Bicubic',
+                    'GrayImageResolution': 150,
+                    'MonoImageDownsampleType': '/Bicubic',
+                    'MonoImageResolution': 150,
+                    'CompressFonts': True,
+                    'Optimize': True
+                }
             },
             'high': {
+                # Compression légère - préserve la qualité
                 'dpi': 300,
-                'gs_options': ['-dPDFSETTINGS=/printer', '-dCompatibilityLevel=1.4']
+                'jpeg_quality': 85,
+                'mono_dpi': 400,
+                'distiller_params': {
+                    'CompatibilityLevel': 1.4,
+                    'ColorImageDownsampleType': '/Bicubic',
+                    'ColorImageResolution': 300,
+                    'GrayImageDownsampleType': '/Bicubic',
+                    'GrayImageResolution': 300,
+                    'MonoImageDownsampleType': '/Bicubic',
+                    'MonoImageResolution': 300,
+                    'Optimize': True
+                }
             }
         }
     
-    def compress_pdf(self, input_path, output_path, quality='medium'):
+    def compress_pdf(self, input_path, output_path=None, quality='medium', chunked=None, engine=None,
+                     target_size=None, never_bigger=True, content_aware=False):
         """
-        Compresse un fichier PDF en utilisant Ghostscript
+        Compresse un fichier PDF avec Ghostscript ou PyMuPDF
+        
+        Le moteur PyMuPDF rééchantillonne les images au-delà de la résolution cible, réduit
+        les polices à leurs sous-ensembles et réécrit le fichier dans le processus. Avec
+        Ghostscript et un pool, le travail est confié à un interpréteur déjà démarré ; sinon un processus
+        gs est lancé, les sources en mémoire lui étant envoyées sur stdin et, sans output_path,
+        le résultat étant lu sur stdout. Les longs documents sont découpés en tranches de
+        pages compressées chacune par son propre processus gs, puis réassemblées.
+        
+        En mode content_aware, chaque page est d'abord classée (texte/vectoriel, photo, scan noir
+        et blanc) : les pages de texte sont laissées intactes, les photos réencodées en JPEG et les
+        scans noir et blanc convertis en CCITT G4 ; les décisions sont dans last_report['pages'].
+        
+        Le résultat n'est jamais plus lourd que l'original : sans gain, une réécriture sans
+        perte est tentée, puis l'original est rendu tel quel (last_report['engine'] l'indique).
         
         Args:
-            input_path: Chemin du fichier PDF source
-            output_path: Chemin du fichier compressé
-            quality: Niveau de qualité ('low', 'medium', 'high')
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
+            output_path: Chemin du fichier compressé (None = retourner les octets)
+            quality: Niveau de qualité ('low', 'medium', 'high', ou 'optimize' : réécriture sans perte)
+            chunked: Compression par tranches (None = automatique selon le nombre de pages, Ghostscript)
+            engine: Moteur de compression ('ghostscript' ou 'pymupdf', self.engine par défaut)
+            target_size: Taille maximale visée en octets (remplace quality, moteur PyMuPDF)
+            never_bigger: Rendre l'original (ou sa réécriture sans perte) si la compression ne réduit rien
+            content_aware: Traitement adapté au contenu de chaque page (moteur PyMuPDF)
         
         Returns:
-            bool: True si la compression a réussi, False sinon
+            bool ou bytes: True si la compression a réussi, ou le PDF compressé si output_path est None
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
+            check_source(input_path)
+            
+            engine = engine or self.engine
+            if engine not in self.supported_engines:
+                raise ValueError(f"Moteur non supporté: {engine}. Utilisez: {self.supported_engines}")
+            
+            if not target_size and quality not in self.quality_settings and quality != self.lossless_quality:
+                raise ValueError(f"Qualité non supportée: {quality}. "
+                                 f"Utilisez: {list(self.quality_settings.keys()) + [self.lossless_quality]}")
+            
+            start = time.perf_counter()
+            settings = pages = None
+            self.optimizer.last_report = None
+            if target_size:
+                # Le réglage image par image n'est possible qu'avec PyMuPDF
+                engine, quality = 'pymupdf', 'target'
+                result, settings = self._compress_to_target(input_path, output_path, target_size)
+            elif quality == self.lossless_quality:
+                # Sans perte : toujours dans le processus, les pixels ne changent pas
+                engine = 'pymupdf'
+                result = self.optimizer.optimize_pdf(input_path, output_path)
+            elif content_aware:
+                # Décisions image par image : uniquement avec PyMuPDF
+                engine = 'pymupdf'
+                result, pages = self._compress_content_aware(input_path, output_path,
+                                                             self.quality_settings[quality])
+            elif engine == 'pymupdf':
+                result = self._compress_with_pymupdf(input_path, output_path, self.quality_settings[quality])
+            else:
+                result = self._compress_with_ghostscript(input_path, output_path, quality, chunked)
             
-            if quality not in self.quality_settings:
-                raise ValueError(f"Qualité non supportée: {quality}. Utilisez: {list(self.quality_settings.keys())}")
+            input_size = source_size(input_path)
+            output_size = len(result) if output_path is None else os.path.getsize(output_path)
+            requested_engine = engine
+            if never_bigger and output_size >= input_size:
+                result, engine, output_size = self._fallback_not_bigger(input_path, output_path, input_size)
             
-            # Vérifier si Ghostscript est installé
+            self.last_report = {
+                'engine': engine,
+                'requested_engine': requested_engine,
+                'incompressible': engine == 'original',
+                'quality': quality,
+                'input_size': input_size,
+                'output_size': output_size,
+                'ratio': round(output_size / input_size, 3) if input_size else 0.0,
+                'duration': round(time.perf_counter() - start, 3)
+            }
+            if target_size:
+                self.last_report['target_size'] = target_size
+                self.last_report['settings'] = settings
+            if pages is not None:
+                self.last_report['pages'] = pages
+            if self.optimizer.last_report is not None and engine != 'original':
+                self.last_report['deduplication'] = self.optimizer.last_report
+            return result
+        
+        except subprocess.TimeoutExpired:
+            raise RuntimeError("La compression a pris trop de temps")
+        except Exception as e:
+            raise RuntimeError(f"Erreur lors de la compression: {str(e)}")
+    
+    def _fallback_not_bigger(self, input_path, output_path, input_size):
+        """
+        Remplace un résultat plus lourd que l'original
+        
+        Returns:
+            tuple: (bool ou bytes comme compress_pdf, 'lossless' ou 'original', taille produite)
+        """
+        data = self.optimizer.optimize_pdf(input_path)
+        if len(data) < input_size:
+            engine = 'lossless'
+        elif output_path is not None and not is_in_memory(input_path):
+            shutil.copyfile(input_path, output_path)
+            return True, 'original', input_size
+        elif is_in_memory(input_path):
+            data, engine = bytes(input_path), 'original'
+        else:
+            with open(input_path, 'rb') as f:
+                data, engine = f.read(), 'original'
+        
+        if output_path is None:
+            return data, engine, len(data)
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        return True, engine, len(data)
+    
+    def compare_engines(self, input_path, quality='medium'):
+        """
+        Compresse le même document avec chaque moteur disponible pour choisir le meilleur
+        
+        Args:
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
+            quality: Niveau de qualité ('low', 'medium', 'high')
+        
+        Returns:
+            list: Un rapport par moteur (taille produite, durée), ou l'erreur rencontrée
+        """
+        reports = []
+        for engine in self.supported_engines:
+            try:
+                # Résultat brut de chaque moteur, sans repli vers l'original
+                self.compress_pdf(input_path, None, quality, engine=engine, never_bigger=False)
+                reports.append(self.last_report)
+            except RuntimeError as e:
+                reports.append({'engine': engine, 'quality': quality, 'error': str(e)})
+        return reports
+    
+    def _compress_with_ghostscript(self, input_path, output_path, quality, chunked):
+        """Compression Ghostscript : pool, tranches parallèles ou processus gs unique"""
+        # Vérifier si Ghostscript est installé (détecté une seule fois par processus)
+        if self.pool is None and not self._check_ghostscript():
+            raise RuntimeError("Ghostscript n'est pas installé sur le système")
+        
+        distiller_params = self.quality_settings[quality]['distiller_params']
+        
+        if chunked is None:
+            with open_pdf(input_path) as pdf_document:
+                page_count = pdf_document.page_count
+            chunked = self.max_workers > 1 and page_count >= self.chunk_min_pages
+        
+        if chunked:
             if not self._check_ghostscript():
                 raise RuntimeError("Ghostscript n'est pas installé sur le système")
+            return self._compress_chunked(input_path, output_path, distiller_params)
+        
+        if self.pool is not None:
+            return self._compress_with_pool(input_path, output_path, distiller_params)
+        
+        # Commande Ghostscript pour la compression
+        cmd = self._gs_command(distiller_params, '-' if is_in_memory(input_path) else input_path,
+                               output_path or '-')
+        
+        if output_path is None:
+            # Sortie sur stdout : les messages de Ghostscript doivent aller sur stderr
+            cmd.insert(1, '-sstdout=%stderr')
+        
+        # Exécuter la commande (source en mémoire passée sur stdin)
+        stdin_data = bytes(input_path) if is_in_memory(input_path) else None
+        result = subprocess.run(cmd, input=stdin_data, capture_output=True, timeout=self.timeout)
+        
+        if result.returncode != 0:
+            raise RuntimeError(f"Erreur Ghostscript: {result.stderr.decode(errors='replace')}")
+        
+        if output_path is None:
+            if not result.stdout:
+                raise RuntimeError("Ghostscript n'a produit aucune donnée")
+            return result.stdout
+        
+        if not os.path.exists(output_path):
+            raise RuntimeError("Le fichier compressé n'a pas été créé")
+        
+        return True
+    
+    def _compress_with_pymupdf(self, input_path, output_path, settings):
+        """Compression dans le processus avec PyMuPDF : images, polices puis réécriture du fichier"""
+        pdf_document = open_pdf(input_path)
+        try:
+            if pdf_document.is_encrypted:
+                raise ValueError("PDF crypté non supporté")
             
-            settings = self.quality_settings[quality]
-            
-            # Commande Ghostscript pour la compression
-            cmd = [
-                'gs',
-                '-sDEVICE=pdfwrite',
-                '-dCompatibilityLevel=1.4',
-                '-dNOPAUSE',
-                '-dQUIET',
-                '-dBATCH',
-                f'-sOutputFile={output_path}',
-                input_path
-            ]
-            
-            # Ajouter les paramètres selon la qualité
-            if quality == 'low':
-                # Compression maximale - utilise PDFSETTINGS pour une compression agressive
-                cmd.extend([
-                    '-dPDFSETTINGS=/screen',
-                    '-dOptimize=true',
-                    '-dCompressFonts=true',
-                    '-dSubsetFonts=true'
-                ])
-            elif quality == 'medium':
-                # Compression équilibrée - paramètres personnalisés
-                cmd.extend([
-                    '-dColorImageDownsampleType=/Bicubic',
-                    '-dColorImageResolution=150',
-                    '-dGrayImageDownsampleType=/Bicubic',
-                    '-dGrayImageResolution=150',
-                    '-dMonoImageDownsampleType=/Bicubic',
-                    '-dMonoImageResolution=150',
-                    '-dOptimize=true',
-                    '-dCompressFonts=true'
-                ])
-            elif quality == 'high':
-                # Compression légère - préserve la qualité
-                cmd.extend([
-                    '-dColorImageDownsampleType=/Bicubic',
-                    '-dColorImageResolution=300',
-                    '-dGrayImageDownsampleType=/Bicubic',
-                    '-dGrayImageResolution=300',
-                    '-dMonoImageDownsampleType=/Bicubic',
-                    '-dMonoImageResolution=300',
-                    '-dOptimize=true'
-                ])
+            # settings None : réécriture sans toucher aux images
+            if settings is not None:
+                images = self._collect_images(pdf_document)
+                downgraded = self._downgrade_colour_spaces(pdf_document, images, settings)
+                self._downsample_images(pdf_document, settings['dpi'], settings['jpeg_quality'],
+                                        {xref: info for xref, info in images.items() if xref not in downgraded})
             
-            # Exécuter la commande
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            # Sous-ensembles de polices (nécessite fontTools) : ignoré si impossible
+            try:
+                pdf_document.subset_fonts()
+            except Exception:
+                pass
             
-            if result.returncode != 0:
-                raise RuntimeError(f"Erreur Ghostscript: {result.stderr}")
+            return self.optimizer.save(pdf_document, output_path)
+        finally:
+            pdf_document.close()
+    
+    def _compress_to_target(self, input_path, output_path, target_size):
+        """
+        Cherche les réglages d'images les plus fidèles qui tiennent dans la taille cible
+        
+        Les tailles sont estimées en réencodant un échantillon des images les plus lourdes ;
+        une recherche dichotomique parmi les réglages candidats évite de compresser tout le
+        document, qui n'est compressé qu'avec le réglage retenu (puis le suivant si besoin).
+        
+        Returns:
+            tuple: (bool ou bytes comme compress_pdf, réglages retenus ou None si sans perte)
+        """
+        pdf_document = open_pdf(input_path)
+        try:
+            if pdf_document.is_encrypted:
+                raise ValueError("PDF crypté non supporté")
             
-            if not os.path.exists(output_path):
-                raise RuntimeError("Le fichier compressé n'a pas été créé")
+            images = self._collect_images(pdf_document)
+            # Texte, polices et structure : approximativement incompressibles par les réglages d'images
+            fixed_bytes = max(0, source_size(input_path) - sum(info['raw_size'] for info in images.values()))
+            if fixed_bytes >= target_size:
+                raise ValueError(f"Taille cible inatteignable : le document hors images pèse déjà "
+                                 f"{fixed_bytes / (1024 * 1024):.2f} MB")
             
-            return True
+            sample = sorted(images, key=lambda xref: images[xref]['raw_size'], reverse=True)[:self.target_sample_images]
+            candidates = self.target_candidates
             
-        except subprocess.TimeoutExpired:
-            raise RuntimeError("La compression a pris trop de temps")
+            def estimate(candidate):
+                return fixed_bytes + self._estimate_image_bytes(pdf_document, images, sample, candidate)
+            
+            # Abandon immédiat si même le réglage le plus agressif reste nettement au-dessus
+            smallest = estimate(candidates[-1])
+            if smallest > target_size * 1.1:
+                raise ValueError(f"Taille cible inatteignable : environ {smallest / (1024 * 1024):.2f} MB au mieux")
+            
+            # Premier candidat (le plus fidèle) dont l'estimation tient dans la cible
+            low, high = 0, len(candidates) - 1
+            while low < high:
+                middle = (low + high) // 2
+                if estimate(candidates[middle]) <= target_size:
+                    high = middle
+                else:
+                    low = middle + 1
+        finally:
+            pdf_document.close()
+        
+        # Compression complète du candidat retenu, puis du suivant si l'estimation était optimiste
+        for candidate in candidates[low:low + 2]:
+            settings = None if candidate is None else {'dpi': candidate[0], 'jpeg_quality': candidate[1],
+                                                       'mono_dpi': max(300, candidate[0])}
+            data = self._compress_with_pymupdf(input_path, None, settings)
+            if len(data) <= target_size:
+                if output_path is None:
+                    return data, settings
+                with open(output_path, 'wb') as f:
+                    f.write(data)
+                return True, settings
+        
+        raise ValueError(f"Taille cible inatteignable : {len(data) / (1024 * 1024):.2f} MB au mieux")
+    
+    def _estimate_image_bytes(self, pdf_document, images, sample, candidate):
+        """Taille totale estimée des images pour un réglage candidat (None = images inchangées)"""
+        if candidate is None:
+            return sum(info['raw_size'] for info in images.values())
+        
+        target_dpi, jpeg_quality = candidate
+        # Octets par pixel produit, mesurés sur l'échantillon
+        sample_sizes = {}
+        encoded_bytes = encoded_pixels = 0
+        for xref in sample:
+            data = self._reencode_image(pdf_document, xref, images[xref], target_dpi, jpeg_quality)
+            if data is not None:
+                sample_sizes[xref] = min(len(data), images[xref]['raw_size'])
+                encoded_bytes += len(data)
+                encoded_pixels += self._output_pixels(images[xref], target_dpi)
+        bytes_per_pixel = encoded_bytes / encoded_pixels if encoded_pixels else None
+        
+        total = 0
+        for xref, info in images.items():
+            if xref in sample_sizes:
+                total += sample_sizes[xref]
+            elif bytes_per_pixel is not None and self._should_reencode(info, target_dpi):
+                total += min(info['raw_size'], self._output_pixels(info, target_dpi) * bytes_per_pixel)
+            else:
+                total += info['raw_size']
+        return total
+    
+    def _collect_images(self, pdf_document):
+        """
+        Inventorie les images du document
+        
+        Returns:
+            dict: xref -> {'page', 'width', 'height', 'bpc', 'smask', 'colour_key', 'filter', 'raw_size', 'dpi'},
+                  dpi étant la résolution effective à la plus grande taille d'affichage (None si non affichée)
+                  et colour_key indiquant un masque par couleurs (/Mask en tableau de valeurs)
+        """
+        images = {}
+        display_sizes = {}
+        for page in pdf_document:
+            for image in page.get_images(full=True):
+                xref = image[0]
+                if xref not in images:
+                    images[xref] = {
+                        'page': page.number,
+                        'smask': image[1],
+                        'colour_key': pdf_document.xref_get_key(xref, 'Mask')[0] == 'array',
+                        'width': image[2],
+                        'height': image[3],
+                        'bpc': image[4],
+                        'filter': image[8],
+                        'raw_size': self._stream_length(pdf_document, xref)
+                    }
+                # get_image_bbox lit la matrice d'affichage sans décoder l'image (contrairement à get_image_rects)
+                try:
+                    rect = page.get_image_bbox(image)
+                except ValueError:
+                    continue
+                if rect.is_empty or rect.is_infinite:
+                    continue
+                width, height = display_sizes.get(xref, (0, 0))
+                display_sizes[xref] = (max(width, rect.width), max(height, rect.height))
+        
+        for xref, info in images.items():
+            display_width, display_height = display_sizes.get(xref, (0, 0))
+            # Résolution effective la plus faible des deux axes (image éventuellement déformée)
+            info['dpi'] = min(info['width'] / (display_width / 72), info['height'] / (display_height / 72)) \
+                if display_width > 0 and display_height > 0 else None
+        return images
+    
+    @staticmethod
+    def _stream_length(pdf_document, xref):
+        """Taille du flux brut d'un objet, lue dans son dictionnaire quand c'est possible"""
+        kind, value = pdf_document.xref_get_key(xref, 'Length')
+        if kind == 'int':
+            return int(value)
+        return len(pdf_document.xref_stream_raw(xref))
+    
+    @staticmethod
+    def _should_reencode(info, target_dpi):
+        """
+        Transparence, masque par couleurs, images monochromes ou déjà sous la résolution cible :
+        conservées telles quelles (replace_image écrit un flux sans /Mask ni /SMask)
+        """
+        return not info['smask'] and not info['colour_key'] and info['bpc'] != 1 \
+            and info['dpi'] is not None and info['dpi'] > target_dpi * 1.1
+    
+    @staticmethod
+    def _output_pixels(info, target_dpi):
+        """Nombre de pixels d'une image après rééchantillonnage à la résolution cible"""
+        scale = min(1.0, target_dpi / info['dpi']) if info['dpi'] else 1.0
+        return max(1, round(info['width'] * scale)) * max(1, round(info['height'] * scale))
+    
+    def _reencode_image(self, pdf_document, xref, info, target_dpi, jpeg_quality, requantize=False):
+        """
+        Image rééchantillonnée à la résolution cible et encodée en JPEG (None si non concernée)
+        
+        Avec requantize, une image déjà à la résolution cible ou en dessous est aussi réencodée
+        (sans rééchantillonnage) : seul le niveau de qualité JPEG fait alors gagner.
+        """
+        if not self._should_reencode(info, target_dpi):
+            # Transparence, masque par couleurs (valeurs exactes perdues en JPEG) et images monochromes exclus
+            if not requantize or info['smask'] or info['colour_key'] or info['bpc'] == 1:
+                return None
+        
+        pix = fitz.Pixmap(pdf_document, xref)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        
+        img = Image.frombytes('L' if pix.n == 1 else 'RGB', (pix.width, pix.height), pix.samples)
+        if info['dpi'] and info['dpi'] > target_dpi * 1.1:
+            scale = target_dpi / info['dpi']
+            img = img.resize((max(1, round(pix.width * scale)), max(1, round(pix.height * scale))),
+                             Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=jpeg_quality, optimize=True)
+        return buffer.getvalue()
+    
+    def _downsample_images(self, pdf_document, target_dpi, jpeg_quality, images=None):
+        """
+        Rééchantillonne en JPEG les images affichées au-delà de la résolution cible
+        
+        La résolution effective d'une image est calculée à partir de sa plus grande taille
+        d'affichage dans le document ; une image n'est remplacée que si le résultat est plus petit.
+        
+        Args:
+            pdf_document: Document PyMuPDF ouvert (modifié sur place)
+            target_dpi: Résolution cible
+            jpeg_quality: Qualité JPEG des images réencodées
+            images: Images à traiter (inventaire de _collect_images, tout le document par défaut)
+        """
+        if images is None:
+            images = self._collect_images(pdf_document)
+        for xref, info in images.items():
+            data = self._reencode_image(pdf_document, xref, info, target_dpi, jpeg_quality)
+            if data is not None and len(data) < info['raw_size']:
+                # replace_image met à jour l'objet image partagé par toutes les pages
+                pdf_document[info['page']].replace_image(xref, stream=data)
+    
+    def analyze_pages(self, input_path):
+        """
+        Classe chaque page du document sans le compresser
+        
+        Args:
+            input_path: Chemin du fichier PDF (ou contenu en octets)
+        
+        Returns:
+            list: Une entrée par page : numéro, classe ('vector', 'photo' ou 'scan'), couverture
+                  d'images, densité de texte et traitement prévu
+        """
+        try:
+            check_source(input_path)
+            with open_pdf(input_path) as pdf_document:
+                pages = self._classify_pages(pdf_document, self._collect_images(pdf_document))
+            for page in pages:
+                del page['image']
+            return pages
         except Exception as e:
-            raise RuntimeError(f"Erreur lors de la compression: {str(e)}")
+            raise RuntimeError(f"Erreur lors de l'analyse du fichier: {str(e)}")
     
-    def _check_ghostscript(self):
-        """Vérifie si Ghostscript est installé"""
+    def _compress_content_aware(self, input_path, output_path, settings):
+        """
+        Compression page par page selon la classe de chaque page
+        
+        Une image partagée par plusieurs pages est traitée selon la première page qui l'affiche.
+        
+        Returns:
+            tuple: (bool ou bytes comme compress_pdf, décisions par page)
+        """
+        pdf_document = open_pdf(input_path)
         try:
-            subprocess.run(['gs', '--version'], capture_output=True, check=True)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
+            if pdf_document.is_encrypted:
+                raise ValueError("PDF crypté non supporté")
+            
+            images = self._collect_images(pdf_document)
+            pages = self._classify_pages(pdf_document, images)
+            replaced = set()
+            
+            # Images des pages photo (et images secondaires des scans) : espace colorimétrique puis JPEG
+            others = {}
+            for xref, info in images.items():
+                page = pages[info['page']]
+                if page['class'] == 'vector':
+                    continue
+                if page['class'] == 'scan' and xref == page['image']:
+                    if self._replace_with_bilevel(pdf_document, xref, info, settings['mono_dpi']):
+                        replaced.add(info['page'])
+                else:
+                    others[xref] = info
+            
+            downgraded = self._downgrade_colour_spaces(pdf_document, others, settings)
+            replaced.update(others[xref]['page'] for xref in downgraded)
+            
+            for xref, info in others.items():
+                if xref in downgraded:
+                    continue
+                # Pages photo : réencodage JPEG au niveau de qualité du profil, même sans rééchantillonnage
+                data = self._reencode_image(pdf_document, xref, info, settings['dpi'], settings['jpeg_quality'],
+                                            requantize=pages[info['page']]['class'] == 'photo')
+                if data is not None and len(data) < info['raw_size']:
+                    pdf_document[info['page']].replace_image(xref, stream=data)
+                    replaced.add(info['page'])
+            
+            for page in pages:
+                if page['page'] - 1 not in replaced:
+                    page['action'] = 'unchanged'
+                del page['image']
+            
+            try:
+                pdf_document.subset_fonts()
+            except Exception:
+                pass
+            
+            return self.optimizer.save(pdf_document, output_path), pages
+        finally:
+            pdf_document.close()
+    
+    def _classify_pages(self, pdf_document, images):
+        """
+        Classe les pages d'après la surface couverte par les images et la densité de texte
+        
+        - 'vector' : peu d'images, ou texte dense autour d'images ne couvrant pas toute la page ;
+        - 'scan' : image dominante noir et blanc (niveaux de gris ou couleur quasi binaires) ;
+        - 'photo' : autres pages couvertes d'images.
+        
+        Returns:
+            list: Décisions par page ('image' = xref de l'image dominante, pour la compression)
+        """
+        actions = {'vector': 'unchanged', 'photo': 'jpeg', 'scan': 'ccitt_g4'}
+        pages = []
+        for page in pdf_document:
+            page_area = abs(page.rect) or 1.0
+            covered = 0.0
+            dominant, dominant_area = None, 0.0
+            for image in page.get_images(full=True):
+                try:
+                    area = abs(page.get_image_bbox(image) & page.rect)
+                except ValueError:
+                    continue
+                covered += area
+                if area > dominant_area:
+                    dominant, dominant_area = image[0], area
+            coverage = min(1.0, covered / page_area)
+            density = len(page.get_text().strip()) / (page_area / 1000)
+            
+            if coverage < self.image_page_coverage or (coverage < 0.9 and density >= self.text_page_density):
+                page_class = 'vector'
+            elif dominant in images and self._is_bilevel(pdf_document, dominant, images[dominant]):
+                page_class = 'scan'
+            else:
+                page_class = 'photo'
+            
+            pages.append({
+                'page': page.number + 1,
+                'class': page_class,
+                'image_coverage': round(coverage, 3),
+                'text_density': round(density, 2),
+                'action': actions[page_class],
+                'image': dominant
+            })
+        return pages
+    
+    def _is_bilevel(self, pdf_document, xref, info):
+        """Image dont presque tous les pixels sont noirs ou blancs, sans couleur marquée"""
+        # Masque par couleurs : ses valeurs n'ont de sens que dans l'espace colorimétrique d'origine
+        if info['smask'] or info['colour_key']:
             return False
+        if info['bpc'] == 1:
+            # Les masques (ImageMask) peignent une couleur : ils ne sont pas des scans
+            return pdf_document.xref_get_key(xref, 'ImageMask')[1] != 'true'
+        return self._pixel_class(self._decode_image(pdf_document, xref, info)) == 'bilevel'
     
-    def get_compression_info(self, input_path):
+    def _pixel_class(self, img):
         """
-        Obtient des informations sur le fichier PDF pour estimer la compression
+        Contenu réel d'une image décodée, par des opérations Pillow sur l'image entière
+        
+        Returns:
+            str: 'bilevel' (quasi noir et blanc), 'gray' (niveaux de gris) ou 'colour'
+        """
+        pixels = img.width * img.height
+        if img.mode == 'RGB':
+            # Écart maximal entre canaux de chaque pixel : nul pour un gris stocké en RVB
+            red, green, blue = img.split()
+            spread = ImageChops.lighter(ImageChops.difference(red, green), ImageChops.difference(green, blue))
+            if sum(spread.histogram()[:self.gray_tolerance + 1]) < self.gray_ratio * pixels:
+                return 'colour'
+            img = img.convert('L')
+        
+        histogram = img.histogram()
+        if sum(histogram[:64]) + sum(histogram[192:]) >= self.bilevel_ratio * pixels:
+            return 'bilevel'
+        return 'gray'
+    
+    @staticmethod
+    def _decode_image(pdf_document, xref, info):
+        """Image décodée en niveaux de gris ('L') ou en couleur ('RGB')"""
+        if info['filter'] == 'DCTDecode':
+            try:
+                img = Image.open(io.BytesIO(pdf_document.xref_stream_raw(xref)))
+                if img.mode in ('L', 'RGB'):
+                    img.load()
+                    return img
+            except Exception:
+                pass
+        
+        pix = fitz.Pixmap(pdf_document, xref)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        return Image.frombytes('L' if pix.n == 1 else 'RGB', (pix.width, pix.height), pix.samples)
+    
+    @staticmethod
+    def _resample(img, info, target_dpi):
+        """Rééchantillonne une image décodée si sa résolution effective dépasse la cible"""
+        if not info['dpi'] or info['dpi'] <= target_dpi * 1.1:
+            return img
+        scale = target_dpi / info['dpi']
+        return img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+    
+    def _encode_bilevel(self, img, info, target_dpi):
+        """
+        Seuille une image sans tramage et l'encode en CCITT G4
+        
+        L'image est encodée par libtiff ; la bande G4 unique du TIFF devient le flux de l'image.
+        
+        Returns:
+            tuple ou None: (données G4, largeur, hauteur), None si l'encodeur est indisponible
+        """
+        img = self._resample(img.convert('L'), info, target_dpi).convert('1', dither=Image.NONE)
+        
+        buffer = io.BytesIO()
+        try:
+            # Une seule bande (RowsPerStrip = hauteur) : le flux G4 est contigu
+            img.save(buffer, 'TIFF', compression='group4', tiffinfo={278: img.height})
+        except (OSError, ValueError):
+            # Pillow compilé sans libtiff
+            return None
+        tiff = Image.open(buffer)
+        offsets, counts = tiff.tag_v2.get(273), tiff.tag_v2.get(279)
+        if not offsets or len(offsets) != 1:
+            return None
+        return buffer.getvalue()[offsets[0]:offsets[0] + counts[0]], img.width, img.height
+    
+    @staticmethod
+    def _write_image(pdf_document, xref, data, width, height, filter_name, colorspace, bpc, decode_parms='null'):
+        """Remplace le flux d'une image déjà encodée et met son dictionnaire en accord"""
+        pdf_document.update_stream(xref, data, compress=False)
+        for key, value in (('Filter', filter_name),
+                           ('DecodeParms', decode_parms),
+                           ('Width', str(width)),
+                           ('Height', str(height)),
+                           ('ColorSpace', colorspace),
+                           ('BitsPerComponent', str(bpc)),
+                           ('Decode', 'null')):
+            pdf_document.xref_set_key(xref, key, value)
+    
+    def _write_bilevel(self, pdf_document, xref, encoded):
+        """Remplace une image par son flux CCITT G4"""
+        data, width, height = encoded
+        # Pixels à 0 noirs dans l'image Pillow : codés comme « blancs » par libtiff, d'où BlackIs1
+        self._write_image(pdf_document, xref, data, width, height, '/CCITTFaxDecode', '/DeviceGray', 1,
+                          f'<</K -1/Columns {width}/Rows {height}/BlackIs1 true>>')
+    
+    def _replace_with_bilevel(self, pdf_document, xref, info, target_dpi):
+        """
+        Remplace une image par sa version noir et blanc encodée en CCITT G4
+        
+        Returns:
+            bool: True si l'image a été remplacée (résultat plus petit)
+        """
+        if info['filter'] in ('CCITTFaxDecode', 'JBIG2Decode'):
+            return False
+        
+        encoded = self._encode_bilevel(self._decode_image(pdf_document, xref, info), info, target_dpi)
+        if encoded is None or len(encoded[0]) >= info['raw_size']:
+            return False
+        self._write_bilevel(pdf_document, xref, encoded)
+        return True
+    
+    def _downgrade_colour_spaces(self, pdf_document, images, settings):
+        """
+        Réencode dans un espace plus petit les images RVB grises et les images noir et blanc en niveaux de gris
+        
+        Chaque image est décodée une seule fois : analyse, rééchantillonnage éventuel et
+        encodage (niveaux de gris en JPEG ou Flate selon l'original, noir et blanc en CCITT G4)
+        sont faits en parallèle par Pillow, qui libère le GIL. PyMuPDF n'étant pas utilisable
+        depuis plusieurs threads, lecture des flux et remplacement restent dans le thread appelant.
         
         Args:
-            input_path: Chemin du fichier PDF
+            pdf_document: Document PyMuPDF ouvert (modifié sur place)
+            images: Inventaire des images (_collect_images)
+            settings: Réglages de qualité ('dpi', 'jpeg_quality', 'mono_dpi')
+        
+        Returns:
+            set: xrefs des images remplacées
+        """
+        candidates = [xref for xref, info in images.items() if self._downgrade_candidate(info)]
+        downgraded = set()
+        batch_size = self.max_workers * 2
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Par lots : seules quelques images décodées sont en mémoire à la fois
+            for batch_start in range(0, len(candidates), batch_size):
+                batch = candidates[batch_start:batch_start + batch_size]
+                sources = [self._image_source(pdf_document, xref, images[xref]) for xref in batch]
+                results = executor.map(lambda item: self._downgrade_image(item[0], images[item[1]], settings),
+                                       zip(sources, batch))
+                
+                for xref, result in zip(batch, results):
+                    if result is None:
+                        continue
+                    kind, encoded = result
+                    if kind == 'bilevel':
+                        self._write_bilevel(pdf_document, xref, encoded)
+                    else:
+                        data, width, height, filter_name = encoded
+                        self._write_image(pdf_document, xref, data, width, height, filter_name, '/DeviceGray', 8)
+                    downgraded.add(xref)
+        return downgraded
+    
+    def _downgrade_candidate(self, info):
+        """
+        Image susceptible de changer d'espace colorimétrique : transparence (masque doux ou
+        masque par couleurs, dont les valeurs dépendent de l'espace d'origine), images déjà
+        monochromes ou trop petites pour que le gain compte sont ignorées
+        """
+        return not info['smask'] and not info['colour_key'] and info['bpc'] == 8 \
+            and info['raw_size'] >= self.colour_min_bytes
+    
+    @staticmethod
+    def _image_source(pdf_document, xref, info):
+        """Flux JPEG brut (décodé par Pillow dans un thread) ou image décodée par PyMuPDF"""
+        if info['filter'] == 'DCTDecode':
+            return pdf_document.xref_stream_raw(xref)
+        try:
+            pix = fitz.Pixmap(pdf_document, xref)
+        except RuntimeError:
+            return None
+        if pix.n not in (1, 3) or pix.alpha:
+            return None
+        return Image.frombytes('L' if pix.n == 1 else 'RGB', (pix.width, pix.height), pix.samples)
+    
+    @staticmethod
+    def _source_image(source):
+        """Image Pillow d'une source de _image_source (JPEG brut décodé ici), None si inutilisable"""
+        if source is None or isinstance(source, Image.Image):
+            return source
+        try:
+            img = Image.open(io.BytesIO(source))
+            if img.mode not in ('L', 'RGB'):
+                return None
+            img.load()
+            return img
+        except Exception:
+            return None
+    
+    def _downgrade_image(self, source, info, settings, kind=None):
+        """
+        Analyse une image et l'encode dans l'espace colorimétrique suffisant (exécuté en thread)
+        
+        Args:
+            source: Source de _image_source (ou image Pillow déjà décodée)
+            info: Inventaire de l'image (_collect_images)
+            settings: Réglages de qualité ('dpi', 'jpeg_quality', 'mono_dpi')
+            kind: Classe de pixels déjà calculée (_pixel_class), recalculée si None
+        
+        Returns:
+            tuple ou None: ('bilevel', encodage G4) ou ('gray', (données, largeur, hauteur, filtre)),
+                           None si l'image est en couleur ou si le résultat n'est pas plus petit
+        """
+        img = self._source_image(source)
+        if img is None:
+            return None
+        
+        kind = kind or self._pixel_class(img)
+        if kind == 'colour':
+            return None
+        
+        if kind == 'bilevel':
+            encoded = self._encode_bilevel(img, info, settings['mono_dpi'])
+            if encoded is None or len(encoded[0]) >= info['raw_size']:
+                return None
+            return kind, encoded
+        
+        if img.mode == 'L':
+            # Déjà en niveaux de gris : seul le passage en noir et blanc fait gagner
+            return None
+        
+        img = self._resample(img.convert('L'), info, settings['dpi'])
+        if info['filter'] == 'DCTDecode' or self._should_reencode(info, settings['dpi']):
+            # Original avec pertes ou image rééchantillonnée de toute façon : JPEG en niveaux de gris
+            buffer = io.BytesIO()
+            img.save(buffer, 'JPEG', quality=settings['jpeg_quality'], optimize=True)
+            data, filter_name = buffer.getvalue(), '/DCTDecode'
+        else:
+            data, filter_name = zlib.compress(img.tobytes(), 6), '/FlateDecode'
+        if len(data) >= info['raw_size']:
+            return None
+        return kind, (data, img.width, img.height, filter_name)
+    
+    def _gs_command(self, distiller_params, input_path, output_path, first_page=None, last_page=None):
+        """Construit la ligne de commande gs pdfwrite (éventuellement limitée à une plage de pages)"""
+        cmd = [
+            find_ghostscript(),
+            '-sDEVICE=pdfwrite',
+            '-dNOPAUSE',
+            '-dQUIET',
+            '-dBATCH',
+            *[f'-d{name}={self._format_param(value)}' for name, value in distiller_params.items()]
+        ]
+        if first_page is not None:
+            cmd.extend([f'-dFirstPage={first_page}', f'-dLastPage={last_page}'])
+        cmd.extend([f'-sOutputFile={output_path}', input_path])
+        return cmd
+    
+    def _plan_chunks(self, page_count):
+        """
+        Découpe le document en plages de pages, une par processus gs
+        
+        Au moins 2 tranches par cœur pour équilibrer la charge, sans descendre sous
+        25 pages par tranche (le coût de démarrage de gs deviendrait dominant).
+        
+        Returns:
+            list: Tuples (première page, dernière page), 1-indexés
+        """
+        chunk_count = max(1, min(self.max_workers * 2, page_count // 25))
+        chunk_size = math.ceil(page_count / chunk_count)
+        return [(first, min(first + chunk_size - 1, page_count))
+                for first in range(1, page_count + 1, chunk_size)]
+    
+    def _compress_chunked(self, input_path, output_path, distiller_params):
+        """Compresse les tranches en parallèle puis les réassemble dans l'ordre"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Chaque processus gs relit la source : une source en mémoire est écrite une fois
+            if is_in_memory(input_path):
+                source_path = os.path.join(temp_dir, 'input.pdf')
+                with open(source_path, 'wb') as f:
+                    f.write(input_path)
+            else:
+                source_path = input_path
             
+            with open_pdf(source_path) as source:
+                page_count = source.page_count
+                metadata = source.metadata
+                toc = source.get_toc(simple=False)
+            
+            chunks = self._plan_chunks(page_count)
+            chunk_paths = [os.path.join(temp_dir, f"chunk_{i:04d}.pdf") for i in range(len(chunks))]
+            
+            def run_chunk(index):
+                first_page, last_page = chunks[index]
+                cmd = self._gs_command(distiller_params, source_path, chunk_paths[index], first_page, last_page)
+                result = subprocess.run(cmd, capture_output=True, timeout=self.timeout)
+                if result.returncode != 0 or not os.path.exists(chunk_paths[index]):
+                    raise RuntimeError(f"Erreur Ghostscript (pages {first_page}-{last_page}): "
+                                       f"{result.stderr.decode(errors='replace')}")
+            
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                # list() propage la première erreur rencontrée
+                list(executor.map(run_chunk, range(len(chunks))))
+            
+            merged = fitz.open()
+            try:
+                for chunk_path in chunk_paths:
+                    with fitz.open(chunk_path) as chunk:
+                        merged.insert_pdf(chunk)
+                
+                if merged.page_count != page_count:
+                    raise RuntimeError("Le document réassemblé n'a pas le bon nombre de pages")
+                
+                # Les tranches perdent métadonnées et signets : ils sont repris de la source
+                merged.set_metadata(metadata)
+                merged.set_toc(toc)
+                
+                # garbage=4 fusionne les ressources identiques produites par plusieurs tranches
+                return self.optimizer.save(merged, output_path)
+            finally:
+                merged.close()
+    
+    def _compress_with_pool(self, input_path, output_path, distiller_params):
+        """Compression par un interpréteur du pool (entrées et sorties passent par des fichiers)"""
+        if is_in_memory(input_path):
+            data = self.pool.run_pdfwrite_bytes(bytes(input_path), distiller_params, self.timeout)
+            if output_path is None:
+                return data
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            return True
+        
+        if output_path is None:
+            with open(input_path, 'rb') as f:
+                return self.pool.run_pdfwrite_bytes(f.read(), distiller_params, self.timeout)
+        
+        self.pool.run_pdfwrite(input_path, output_path, distiller_params, self.timeout)
+        return True
+    
+    @staticmethod
+    def _format_param(value):
+        """Valeur d'un paramètre pdfwrite sur la ligne de commande (-dNom=valeur)"""
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        return str(value)
+    
+    def _check_ghostscript(self):
+        """Vérifie si Ghostscript est installé (résultat mémorisé pour tout le processus)"""
+        return find_ghostscript() is not None
+    
+    def get_compression_info(self, input_path, time_budget=0.5):
+        """
+        Obtient des informations sur le fichier PDF pour estimer la compression
+        
+        Les images sont inventoriées (pixels, filtre, résolution effective) et les plus lourdes
+        sont réellement réencodées selon chaque profil, dans la limite de time_budget secondes ;
+        le gain mesuré est extrapolé aux autres images, avec une fourchette tirée de la
+        dispersion des mesures. Les estimations correspondent au moteur PyMuPDF.
+        
+        Args:
+            input_path: Chemin du fichier PDF (ou contenu en octets)
+            time_budget: Durée maximale consacrée aux échantillons (en secondes)
+        
         Returns:
             dict: Informations sur le fichier
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
+            check_source(input_path)
+            
+            start = time.perf_counter()
+            file_size = source_size(input_path)
             
-            file_size = os.path.getsize(input_path)
+            with open_pdf(input_path) as pdf_document:
+                images = self._collect_images(pdf_document)
+                image_bytes = sum(info['raw_size'] for info in images.values())
+                fixed_bytes = max(0, file_size - image_bytes)
+                
+                # Les images en double sont fusionnées à l'écriture (garbage=4) : elles ne coûtent rien
+                duplicates = self._duplicate_images(pdf_document, images)
+                unique = {xref: info for xref, info in images.items() if xref not in duplicates}
+                
+                # Échantillon : images les plus lourdes, réencodées pour chaque profil
+                ratios = {quality: [] for quality in self.quality_settings}
+                sampled = {quality: {} for quality in self.quality_settings}
+                for xref in sorted(unique, key=lambda xref: unique[xref]['raw_size'], reverse=True):
+                    if time.perf_counter() - start > time_budget and any(ratios.values()):
+                        break
+                    info = images[xref]
+                    # Image décodée et classée une fois pour tous les profils (changement d'espace)
+                    img = self._source_image(self._image_source(pdf_document, xref, info)) \
+                        if self._downgrade_candidate(info) else None
+                    downgrade = (img, self._pixel_class(img)) if img is not None else None
+                    for quality, settings in self.quality_settings.items():
+                        size = self._sample_image_size(pdf_document, xref, info, settings, downgrade)
+                        sampled[quality][xref] = size
+                        if info['raw_size']:
+                            ratios[quality].append(size / info['raw_size'])
             
+            estimates = {}
+            for quality in self.quality_settings:
+                measured = sum(sampled[quality].values())
+                rest = sum(info['raw_size'] for xref, info in unique.items() if xref not in sampled[quality])
+                quality_ratios = ratios[quality] or [1.0]
+                mean_ratio = sum(quality_ratios) / len(quality_ratios)
+                # Structure et polices : gain sans perte de 0 à 30 %
+                estimates[quality] = {
+                    'size_bytes': int(fixed_bytes * 0.85 + measured + rest * mean_ratio),
+                    'min_bytes': int(fixed_bytes * 0.7 + measured + rest * min(quality_ratios)),
+                    'max_bytes': int(fixed_bytes + measured + rest * max(quality_ratios))
+                }
+            
+            # Un profil plus doux ne produit pas un fichier plus petit (extrapolation sur peu d'images)
+            for gentler, stronger in (('medium', 'low'), ('high', 'medium')):
+                for key in ('size_bytes', 'min_bytes', 'max_bytes'):
+                    estimates[gentler][key] = max(estimates[gentler][key], estimates[stronger][key])
+            
+            labels = {'low': 'compression maximale', 'medium': 'compression équilibrée', 'high': 'compression légère'}
             return {
                 'file_size_mb': round(file_size / (1024 * 1024), 2),
                 'file_size_bytes': file_size,
+                'image_count': len(images),
+                'duplicate_images': len(duplicates),
+                'image_bytes': image_bytes,
+                'sampled_images': len(sampled['medium']),
                 'estimated_compression': {
-                    'low': f"{round(file_size * 0.2 / (1024 * 1024), 2)} MB (compression maximale)",
-                    'medium': f"{round(file_size * 0.4 / (1024 * 1024), 2)} MB (compression équilibrée)",
-                    'high': f"{round(file_size * 0.7 / (1024 * 1024), 2)} MB (compression légère)"
-                }
+                    quality: f"{round(estimate['size_bytes'] / (1024 * 1024), 2)} MB "
+                             f"({round(estimate['min_bytes'] / (1024 * 1024), 2)} - "
+                             f"{round(estimate['max_bytes'] / (1024 * 1024), 2)} MB, {labels.get(quality, quality)})"
+                    for quality, estimate in estimates.items()
+                },
+                'estimates': estimates,
+                'duration': round(time.perf_counter() - start, 3)
             }
         except Exception as e:
             raise RuntimeError(f"Erreur lors de l'analyse du fichier: {str(e)}")
+    
+    def _duplicate_images(self, pdf_document, images):
+        """Images dont le flux est identique à celui d'une image précédente (hachées seulement si même taille)"""
+        by_size = {}
+        for xref, info in images.items():
+            by_size.setdefault(info['raw_size'], []).append(xref)
+        
+        duplicates = set()
+        for xrefs in by_size.values():
+            if len(xrefs) < 2:
+                continue
+            seen = set()
+            for xref in xrefs:
+                digest = hashlib.md5(pdf_document.xref_stream_raw(xref)).digest()
+                if digest in seen:
+                    duplicates.add(xref)
+                seen.add(digest)
+        return duplicates
+    
+    def _sample_image_size(self, pdf_document, xref, info, settings, downgrade=None):
+        """
+        Taille d'une image après compression selon un profil (mesure rapide pour l'estimation)
+        
+        Comme à la compression, une image grise ou noir et blanc est d'abord passée en niveaux
+        de gris ou en CCITT G4 (downgrade : image décodée et sa classe de pixels, None si elle
+        n'est pas candidate). Sinon, les JPEG sont décodés directement à échelle réduite
+        (draft) : seule la taille produite compte ici, pas la fidélité du rééchantillonnage.
+        """
+        if downgrade is not None and downgrade[1] != 'colour':
+            downgraded = self._downgrade_image(downgrade[0], info, settings, downgrade[1])
+            if downgraded is not None:
+                # ('bilevel' ou 'gray', (données, ...))
+                return len(downgraded[1][0])
+        
+        target_dpi, jpeg_quality = settings['dpi'], settings['jpeg_quality']
+        if not self._should_reencode(info, target_dpi):
+            # Image conservée : seule une image non compressée gagne à être réécrite (deflate)
+            if not info['filter']:
+                return len(zlib.compress(pdf_document.xref_stream_raw(xref), 6))
+            return info['raw_size']
+        
+        scale = target_dpi / info['dpi']
+        size = (max(1, round(info['width'] * scale)), max(1, round(info['height'] * scale)))
+        img = None
+        if info['filter'] == 'DCTDecode':
+            try:
+                img = Image.open(io.BytesIO(pdf_document.xref_stream_raw(xref)))
+                img.draft('RGB', size)
+                img = img.convert('RGB')
+            except Exception:
+                img = None
+        if img is None:
+            data = self._reencode_image(pdf_document, xref, info, target_dpi, jpeg_quality)
+            return min(len(data), info['raw_size'])
+        
+        buffer = io.BytesIO()
+        img.resize(size).save(buffer, 'JPEG', quality=jpeg_quality)
+        return min(len(buffer.getvalue()), info['raw_size'])
@@ -3,76 +3,359 @@
 # ================================
 
 import os
+import json
 import tempfile
 import io
 from pathlib import Path
 from PIL import Image
 import fitz  # PyMuPDF
-from pdf2docx import Converter
+import fcntl
+import shutil
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from services.pdf_source import check_source, is_in_memory, open_pdf, source_size
+
+
+def _render_pages(input_path, output_dir, format, dpi, page_indexes, jpeg_quality=90, jpeg_progressive=False):
+    """
+    Rend des pages d'un PDF en images (utilisable dans un processus worker)
+    
+    Args:
+        input_path: Chemin du fichier PDF source (ou contenu en octets)
+        output_dir: Dossier de sortie pour les images (None = images gardées en mémoire)
+        format: Format des images
+        dpi: Résolution des images
+        page_indexes: Index des pages à rendre (0-indexés)
+        jpeg_quality: Qualité JPEG (1-95)
+        jpeg_progressive: Encodage JPEG progressif
+    
+    Returns:
+        list: Chemins des images générées, ou tuples (nom, octets) si output_dir est None,
+              dans l'ordre des pages
+    """
+    # Chaque worker ouvre son propre document : fitz.Document n'est pas partageable
+    pdf_document = open_pdf(input_path)
+    try:
+        return list(_iter_page_images(pdf_document, output_dir, format, dpi, page_indexes,
+                                      jpeg_quality, jpeg_progressive))
+    finally:
+        pdf_document.close()
+
+
+def _iter_page_images(pdf_document, output_dir, format, dpi, page_indexes, jpeg_quality=90, jpeg_progressive=False):
+    """
+    Rend des pages d'un document déjà ouvert, une image à la fois
+    
+    Args:
+        pdf_document: Document PDF ouvert
+        output_dir: Dossier de sortie pour les images (None = images gardées en mémoire)
+        format: Format des images
+        dpi: Résolution des images
+        page_indexes: Index des pages à rendre (0-indexés)
+        jpeg_quality: Qualité JPEG (1-95)
+        jpeg_progressive: Encodage JPEG progressif
+    
+    Yields:
+        str ou tuple: Chemin de l'image, ou (nom, octets) si output_dir est None, dans l'ordre des pages
+    """
+    # Nom du format pour PIL ('JPG' n'est pas un nom d'encodeur)
+    pil_format = 'JPEG' if format.upper() in ('JPEG', 'JPG') else format.upper()
+    save_options = {}
+    if pil_format == 'JPEG':
+        save_options = {'quality': jpeg_quality, 'progressive': jpeg_progressive}
+    
+    for page_num in page_indexes:
+        page = pdf_document[page_num]
+        
+        # Convertir la page en image (sans canal alpha : aucun des formats de sortie n'en a besoin)
+        mat = fitz.Matrix(dpi/72, dpi/72)  # Matrice de transformation pour le DPI
+        pix = page.get_pixmap(matrix=mat, alpha=False)
+        
+        # Générer le nom du fichier
+        image_filename = f"page_{page_num + 1:03d}.{format.lower()}"
+        
+        if output_dir is None:
+            # Encoder en mémoire (flux ZIP)
+            if pil_format == 'PNG':
+                yield image_filename, pix.tobytes("png")
+            else:
+                buffer = io.BytesIO()
+                _pixmap_to_pil(pix).save(buffer, format=pil_format, **save_options)
+                yield image_filename, buffer.getvalue()
+            continue
+        
+        image_path = os.path.join(output_dir, image_filename)
+        
+        # Sauvegarder l'image
+        if pil_format == 'PNG':
+            pix.save(image_path)
+        else:
+            _pixmap_to_pil(pix).save(image_path, format=pil_format, **save_options)
+        
+        yield image_path
+
+
+def _convert_word_chunk(pdf_path, docx_path, page_indexes):
+    """
+    Convertit des pages en document Word avec pdf2docx (utilisable dans un processus worker)
+    
+    Le document n'apparaît sous son nom qu'une fois complet : un lot interrompu est reconverti.
+    
+    Args:
+        pdf_path: Chemin du fichier PDF source
+        docx_path: Chemin du document Word produit
+        page_indexes: Index des pages à convertir (0-indexés)
+    """
+    # Import différé : pdf2docx charge OpenCV, NumPy et python-docx, inutiles aux autres conversions
+    from pdf2docx import Converter
+    
+    # Nom temporaire propre à cette tentative (plusieurs threads d'un même processus possibles)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(docx_path) or '.',
+                                     prefix=f"{os.path.basename(docx_path)}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        cv = Converter(pdf_path)
+        try:
+            cv.convert(temp_path, pages=list(page_indexes))
+        finally:
+            cv.close()
+        os.replace(temp_path, docx_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+# Document ouvert une fois par processus worker d'extraction (voir _open_extraction_worker)
+_worker_document = None
+
+
+def _open_extraction_worker(input_path):
+    """Initialisation d'un worker : le document est ouvert une seule fois pour tous ses lots"""
+    global _worker_document
+    _worker_document = open_pdf(input_path)
+
+
+def _extract_pages(page_indexes, extractor, *args):
+    """
+    Extrait une liste de pages dans un processus worker
+    
+    Args:
+        page_indexes: Index des pages (0-indexés)
+        extractor: Fonction d'extraction d'une page (_page_text, _page_layout)
+        *args: Arguments supplémentaires de l'extracteur
+    
+    Returns:
+        list: Résultat de l'extracteur pour chaque page, dans l'ordre des pages
+    """
+    return [extractor(_worker_document, page_num, *args) for page_num in page_indexes]
+
+
+def _page_text(pdf_document, page_num):
+    """Texte d'une page suivi du séparateur entre les pages"""
+    return pdf_document[page_num].get_text() + "\n\n"
+
+
+def _page_layout(pdf_document, page_num, compact=False):
+    """
+    Structure du texte d'une page en une ligne JSON (une seule analyse de la page)
+    
+    Les mots sont découpés dans les caractères de chaque fragment (span) : ils portent la
+    police, la taille, les attributs et la couleur de ce fragment. En mode compact, les mots
+    sont encodés en colonnes, avec une table des polices et des index de bloc et de ligne.
+    
+    Returns:
+        str: Ligne JSON terminée par un saut de ligne
+    """
+    page = pdf_document[page_num]
+    raw = page.get_text('rawdict', textpage=page.get_textpage())
+    blocks = []
+    for block in raw['blocks']:
+        if block['type'] != 0:
+            continue
+        lines = []
+        for line in block['lines']:
+            words = []
+            for span in line['spans']:
+                font = (span['font'], round(span['size'], 2), span['flags'], span['color'])
+                word, bbox = '', None
+                for char in span['chars'] + [None]:
+                    if char is None or char['c'].isspace():
+                        if word:
+                            words.append({'text': word, 'bbox': [round(value, 2) for value in bbox], 'font': font})
+                        word, bbox = '', None
+                        continue
+                    word += char['c']
+                    x0, y0, x1, y1 = char['bbox']
+                    bbox = [x0, y0, x1, y1] if bbox is None else \
+                        [min(bbox[0], x0), min(bbox[1], y0), max(bbox[2], x1), max(bbox[3], y1)]
+            lines.append({'bbox': [round(value, 2) for value in line['bbox']], 'dir': line['dir'], 'words': words})
+        blocks.append({'bbox': [round(value, 2) for value in block['bbox']], 'lines': lines})
+    
+    record = {'page': page_num + 1, 'width': round(page.rect.width, 2), 'height': round(page.rect.height, 2)}
+    if compact:
+        record.update(_columnar_layout(blocks))
+    else:
+        for block in blocks:
+            for line in block['lines']:
+                for word in line['words']:
+                    name, size, flags, color = word.pop('font')
+                    word.update({'font': name, 'size': size, 'flags': flags, 'color': color})
+        record['blocks'] = blocks
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+
+def _columnar_layout(blocks):
+    """Encodage en colonnes : une liste par attribut plutôt qu'un objet par mot"""
+    fonts = {}
+    columns = {'block_bbox': [], 'line_block': [], 'line_bbox': [],
+               'text': [], 'x0': [], 'y0': [], 'x1': [], 'y1': [], 'font': [], 'line': []}
+    for block_index, block in enumerate(blocks):
+        columns['block_bbox'].append(block['bbox'])
+        for line in block['lines']:
+            line_index = len(columns['line_bbox'])
+            columns['line_block'].append(block_index)
+            columns['line_bbox'].append(line['bbox'])
+            for word in line['words']:
+                x0, y0, x1, y1 = word['bbox']
+                columns['text'].append(word['text'])
+                columns['x0'].append(x0)
+                columns['y0'].append(y0)
+                columns['x1'].append(x1)
+                columns['y1'].append(y1)
+                columns['font'].append(fonts.setdefault(word['font'], len(fonts)))
+                columns['line'].append(line_index)
+    # Table des polices : [nom, taille, attributs, couleur], référencée par index
+    columns['fonts'] = [list(font) for font in fonts]
+    return columns
+
+
+def _pixmap_to_pil(pix):
+    """Image PIL construite sur le tampon du pixmap, sans copie ni PNG intermédiaire"""
+    mode = 'L' if pix.n == 1 else 'RGB'
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, 'raw', mode, pix.stride, 1)
+
 
 class PDFConverter:
     """Service pour convertir des fichiers PDF"""
     
-    def __init__(self):
+    def __init__(self, workers=None, parallel_min_pages=16):
         self.supported_image_formats = ['PNG', 'JPEG', 'JPG', 'TIFF', 'BMP']
         self.supported_doc_formats = ['DOCX', 'DOC']
+        # Rendu parallèle : un processus par cœur, sauf pour les petits documents
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_min_pages = parallel_min_pages
+        # Pages rendues par tâche en mode flux (le premier morceau part après ce nombre de pages)
+        self.stream_chunk_pages = 4
+        # Pages de texte extraites par tâche en parallèle (l'extraction d'une page est rapide)
+        self.text_chunk_pages = 32
+        # Pages converties en Word par lot (un lot terminé est un point de reprise)
+        self.word_chunk_pages = 20
     
-    def pdf_to_images(self, input_path, output_dir, format='PNG', dpi=150):
+    def pdf_to_images(self, input_path, output_dir, format='PNG', dpi=150, workers=None,
+                      jpeg_quality=90, jpeg_progressive=False, pages=None):
         """
         Convertit un PDF en images
         
         Args:
-            input_path: Chemin du fichier PDF source
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
             output_dir: Dossier de sortie pour les images
             format: Format des images ('PNG', 'JPEG', 'TIFF', 'BMP')
             dpi: Résolution des images (150 par défaut)
+            workers: Nombre de processus de rendu (self.workers par défaut, 1 = série)
+            jpeg_quality: Qualité JPEG (1-95, 90 par défaut)
+            jpeg_progressive: Encodage JPEG progressif
+            pages: Numéros des pages à convertir (1-indexés, toutes par défaut)
         
         Returns:
             list: Liste des chemins des images générées
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
-            
             if format.upper() not in self.supported_image_formats:
                 raise ValueError(f"Format non supporté: {format}. Utilisez: {self.supported_image_formats}")
             
+            # Pages à rendre (leur nombre décide entre rendu série et parallèle)
+            page_indexes = self._page_indexes(input_path, pages)
+            page_count = len(page_indexes)
+            
             # Créer le dossier de sortie s'il n'existe pas
             os.makedirs(output_dir, exist_ok=True)
             
-            # Ouvrir le PDF avec PyMuPDF
-            pdf_document = fitz.open(input_path)
-            image_paths = []
+            workers = min(workers or self.workers, page_count)
+            if workers <= 1 or page_count < self.parallel_min_pages:
+                return _render_pages(input_path, output_dir, format, dpi, page_indexes,
+                                     jpeg_quality, jpeg_progressive)
             
-            for page_num in range(pdf_document.page_count):
-                page = pdf_document[page_num]
-                
-                # Convertir la page en image
-                mat = fitz.Matrix(dpi/72, dpi/72)  # Matrice de transformation pour le DPI
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Générer le nom du fichier
-                image_filename = f"page_{page_num + 1:03d}.{format.lower()}"
-                image_path = os.path.join(output_dir, image_filename)
-                
-                # Sauvegarder l'image
-                if format.upper() == 'PNG':
-                    pix.save(image_path)
-                else:
-                    # Convertir en PIL Image pour les autres formats
-                    img_data = pix.tobytes("png")
-                    img = Image.open(io.BytesIO(img_data))
-                    img.save(image_path, format=format.upper())
-                
-                image_paths.append(image_path)
+            # Découper en lots de pages consécutives (2 par worker pour équilibrer la charge)
+            shard_size = -(-page_count // (workers * 2))
+            shards = [list(page_indexes[start:start + shard_size]) for start in range(0, page_count, shard_size)]
             
-            pdf_document.close()
-            return image_paths
+            image_paths = []
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_render_pages, input_path, output_dir, format, dpi, shard,
+                                           jpeg_quality, jpeg_progressive)
+                           for shard in shards]
+                # Les plages sont récupérées dans l'ordre : même ordre que le rendu série
+                for future in futures:
+                    image_paths.extend(future.result())
             
+            return image_paths
+        
         except Exception as e:
             raise RuntimeError(f"Erreur lors de la conversion PDF vers images: {str(e)}")
     
+    def iter_images(self, input_path, format='PNG', dpi=150, workers=None,
+                    jpeg_quality=90, jpeg_progressive=False, pages=None):
+        """
+        Convertit un PDF en images produites au fil de l'eau, sans passer par le disque
+        
+        Les pages sont validées avant le premier rendu ; les erreurs de rendu surviennent
+        pendant l'itération.
+        
+        Args:
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
+            format: Format des images ('PNG', 'JPEG', 'TIFF', 'BMP')
+            dpi: Résolution des images (150 par défaut)
+            workers: Nombre de processus de rendu (self.workers par défaut, 1 = série)
+            jpeg_quality: Qualité JPEG (1-95, 90 par défaut)
+            jpeg_progressive: Encodage JPEG progressif
+            pages: Numéros des pages à convertir (1-indexés, toutes par défaut)
+        
+        Returns:
+            iterator: Tuples (nom du fichier, octets de l'image), dans l'ordre des pages
+        """
+        if format.upper() not in self.supported_image_formats:
+            raise ValueError(f"Format non supporté: {format}. Utilisez: {self.supported_image_formats}")
+        
+        page_indexes = self._page_indexes(input_path, pages)
+        return self._iter_rendered(input_path, page_indexes, format, dpi, workers, jpeg_quality, jpeg_progressive)
+    
+    def _iter_rendered(self, input_path, page_indexes, format, dpi, workers, jpeg_quality, jpeg_progressive):
+        """Générateur de iter_images : petits lots de pages, fenêtre glissante en parallèle"""
+        chunk = self.stream_chunk_pages
+        shards = [list(page_indexes[start:start + chunk]) for start in range(0, len(page_indexes), chunk)]
+        workers = min(workers or self.workers, len(shards))
+        
+        if workers <= 1 or len(page_indexes) < self.parallel_min_pages:
+            # En série, un seul document ouvert : les lots ne servent qu'à répartir le travail
+            pdf_document = open_pdf(input_path)
+            try:
+                yield from _iter_page_images(pdf_document, None, format, dpi, page_indexes,
+                                             jpeg_quality, jpeg_progressive)
+            finally:
+                pdf_document.close()
+            return
+        
+        # Au plus 2 lots en vol par worker : mémoire bornée, ordre des pages conservé
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = []
+            for shard in shards:
+                pending.append(executor.submit(_render_pages, input_path, None, format, dpi, shard,
+                                               jpeg_quality, jpeg_progressive))
+                if len(pending) >= workers * 2:
+                    yield from pending.pop(0).result()
+            for future in pending:
+                yield from future.result()
+    
     def images_to_pdf(self, image_paths, output_path, quality=95):
         """
         Convertit des images en PDF
@@ -116,92 +399,289 @@ class PDFConverter:
             pdf_document.close()
             
             return True
-            
+        
         except Exception as e:
             raise RuntimeError(f"Erreur lors de la conversion images vers PDF: {str(e)}")
     
-    def pdf_to_word(self, input_path, output_path):
+    def pdf_to_word(self, input_path, output_path=None, pages=None, workers=None,
+                    checkpoint_dir=None, progress=None):
         """
         Convertit un PDF en document Word
         
+        pdf2docx ne travaille que sur des chemins : une source en mémoire (ou une sortie
+        sans output_path) passe par un dossier temporaire. Au-delà de word_chunk_pages pages,
+        la conversion est découpée en lots convertis en parallèle puis assemblés dans l'ordre
+        (voir _word_by_chunks).
+        
         Args:
-            input_path: Chemin du fichier PDF source
-            output_path: Chemin du fichier Word de sortie
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
+            output_path: Chemin du fichier Word de sortie (None = retourner les octets)
+            pages: Numéros des pages à convertir (1-indexés, toutes par défaut)
+            workers: Nombre de processus de conversion (un par cœur par défaut)
+            checkpoint_dir: Dossier des lots terminés, réutilisés par une nouvelle tentative
+                            (supprimé une fois le document assemblé)
+            progress: Fonction appelée avec (pages converties, pages à convertir)
         
         Returns:
-            bool: True si la conversion a réussi
+            bool ou bytes: True si la conversion a réussi, ou le document si output_path est None
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
+            page_indexes = list(self._page_indexes(input_path, pages))
             
-            # Utiliser pdf2docx pour la conversion
-            cv = Converter(input_path)
-            cv.convert(output_path, start=0, end=None)
-            cv.close()
+            with tempfile.TemporaryDirectory() as temp_dir:
+                if is_in_memory(input_path):
+                    pdf_path = os.path.join(temp_dir, 'input.pdf')
+                    with open(pdf_path, 'wb') as f:
+                        f.write(input_path)
+                else:
+                    pdf_path = input_path
+                docx_path = output_path or os.path.join(temp_dir, 'output.docx')
+                
+                if len(page_indexes) > self.word_chunk_pages:
+                    self._word_by_chunks(pdf_path, docx_path, page_indexes, workers,
+                                         checkpoint_dir or os.path.join(temp_dir, 'chunks'), progress)
+                else:
+                    # pdf2docx n'analyse que les pages demandées (index 0-indexés)
+                    _convert_word_chunk(pdf_path, docx_path, page_indexes)
+                    if progress is not None:
+                        progress(len(page_indexes), len(page_indexes))
+                
+                if output_path is None:
+                    with open(docx_path, 'rb') as f:
+                        return f.read()
             
             return True
-            
+        
         except Exception as e:
             raise RuntimeError(f"Erreur lors de la conversion PDF vers Word: {str(e)}")
     
-    def pdf_to_text(self, input_path, output_path=None):
+    def _word_by_chunks(self, pdf_path, docx_path, page_indexes, workers, checkpoint_dir, progress):
+        """
+        Convertit des lots de pages dans des processus séparés, avec reprise, puis les assemble
+        
+        Le dossier de reprise appartient à la conversion qui tient son verrou (fichier
+        checkpoint_dir + '.lock', conservé à côté) : elle seule y écrit et le supprime à la fin.
+        Une conversion identique lancée pendant ce temps travaille dans un dossier privé.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(checkpoint_dir)), exist_ok=True)
+        lock_file = open(f"{checkpoint_dir}.lock", 'a')
+        try:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                with tempfile.TemporaryDirectory() as private_dir:
+                    self._convert_chunks(pdf_path, docx_path, page_indexes, workers, private_dir, progress)
+                return
+            
+            self._convert_chunks(pdf_path, docx_path, page_indexes, workers, checkpoint_dir, progress)
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        finally:
+            # Fermer le fichier libère le verrou
+            lock_file.close()
+    
+    def _convert_chunks(self, pdf_path, docx_path, page_indexes, workers, chunks_dir, progress):
+        """
+        Convertit les lots manquants de chunks_dir puis assemble tous les lots dans l'ordre
+        
+        Chaque lot terminé est un document Word complet : une tentative suivante sur le même
+        dossier ne convertit que les lots manquants. Le plan de découpage est enregistré avec
+        les lots ; s'il a changé, les anciens lots sont écartés.
+        """
+        chunk = self.word_chunk_pages
+        shards = [page_indexes[start:start + chunk] for start in range(0, len(page_indexes), chunk)]
+        chunk_paths = [os.path.join(chunks_dir, f"chunk_{i:04d}.docx") for i in range(len(shards))]
+        
+        os.makedirs(chunks_dir, exist_ok=True)
+        plan_path = os.path.join(chunks_dir, 'plan.json')
+        plan = {'pages': page_indexes, 'chunk_pages': chunk}
+        try:
+            with open(plan_path, 'r', encoding='utf-8') as f:
+                resumable = json.load(f) == plan
+        except (OSError, ValueError):
+            resumable = False
+        if not resumable:
+            for filename in os.listdir(chunks_dir):
+                if filename.startswith('chunk_'):
+                    os.remove(os.path.join(chunks_dir, filename))
+            with open(f"{plan_path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(plan, f)
+            os.replace(f"{plan_path}.tmp", plan_path)
+        
+        remaining = [i for i, path in enumerate(chunk_paths) if not os.path.exists(path)]
+        pages_done = len(page_indexes) - sum(len(shards[i]) for i in remaining)
+        if progress is not None:
+            progress(pages_done, len(page_indexes))
+        
+        workers = min(workers or self.workers, len(remaining))
+        if workers <= 1:
+            for i in remaining:
+                _convert_word_chunk(pdf_path, chunk_paths[i], shards[i])
+                pages_done += len(shards[i])
+                if progress is not None:
+                    progress(pages_done, len(page_indexes))
+        elif remaining:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(_convert_word_chunk, pdf_path, chunk_paths[i], shards[i]): i
+                           for i in remaining}
+                for future in as_completed(futures):
+                    future.result()
+                    pages_done += len(shards[futures[future]])
+                    if progress is not None:
+                        progress(pages_done, len(page_indexes))
+        
+        from services.docx_stitch import stitch_docx
+        stitch_docx(chunk_paths, docx_path)
+    
+    def pdf_to_text(self, input_path, output_path=None, pages=None, workers=1):
         """
         Extrait le texte d'un PDF
         
+        Le texte est écrit page par page dans le fichier de sortie (voir iter_text).
+        
         Args:
-            input_path: Chemin du fichier PDF source
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
             output_path: Chemin du fichier texte de sortie (optionnel)
+            pages: Numéros des pages à extraire (1-indexés, toutes par défaut)
+            workers: Nombre de processus d'extraction (1 = série)
         
         Returns:
             str ou bool: Texte extrait ou True si sauvegardé dans un fichier
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
-            
-            # Ouvrir le PDF avec PyMuPDF
-            pdf_document = fitz.open(input_path)
-            text_content = ""
-            
-            for page_num in range(pdf_document.page_count):
-                page = pdf_document[page_num]
-                text_content += page.get_text()
-                text_content += "\n\n"  # Séparateur entre les pages
-            
-            pdf_document.close()
+            chunks = self.iter_text(input_path, pages, workers)
             
             if output_path:
                 # Sauvegarder dans un fichier
                 with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(text_content)
+                    f.writelines(chunks)
                 return True
             else:
                 # Retourner le texte
-                return text_content
-                
+                return ''.join(chunks)
+        
         except Exception as e:
             raise RuntimeError(f"Erreur lors de l'extraction de texte: {str(e)}")
     
+    def iter_text(self, input_path, pages=None, workers=1):
+        """
+        Extrait le texte d'un PDF page par page, au fil de l'eau
+        
+        La mémoire occupée ne dépend pas du nombre de pages : seules les pages en cours
+        d'extraction (quelques lots en parallèle) sont gardées. Les pages sont validées avant
+        la première extraction ; les erreurs d'extraction surviennent pendant l'itération.
+        
+        Args:
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
+            pages: Numéros des pages à extraire (1-indexés, toutes par défaut)
+            workers: Nombre de processus d'extraction (1 = série, None = un par cœur)
+        
+        Returns:
+            iterator: Texte de chaque page suivi d'un séparateur, dans l'ordre des pages
+        """
+        return self._iter_extracted(input_path, self._page_indexes(input_path, pages), workers, _page_text)
+    
+    def pdf_to_layout(self, input_path, output_path=None, pages=None, compact=False, workers=1):
+        """
+        Extrait la structure du texte d'un PDF en JSON Lines (une ligne par page)
+        
+        Args:
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
+            output_path: Chemin du fichier .jsonl de sortie (optionnel)
+            pages: Numéros des pages à extraire (1-indexés, toutes par défaut)
+            compact: Encodage en colonnes (mots, lignes et blocs), pour les très longs documents
+            workers: Nombre de processus d'extraction (1 = série)
+        
+        Returns:
+            str ou bool: Lignes JSON ou True si sauvegardées dans un fichier
+        """
+        try:
+            chunks = self.iter_layout(input_path, pages, compact, workers)
+            
+            if output_path:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.writelines(chunks)
+                return True
+            return ''.join(chunks)
+        
+        except Exception as e:
+            raise RuntimeError(f"Erreur lors de l'extraction de la mise en page: {str(e)}")
+    
+    def iter_layout(self, input_path, pages=None, compact=False, workers=1):
+        """
+        Extrait la structure du texte page par page, au fil de l'eau
+        
+        Chaque ligne JSON décrit une page : blocs, lignes et mots avec leurs rectangles
+        (en points, origine en haut à gauche) et, pour chaque mot, police, taille,
+        attributs (gras, italique...) et couleur.
+        
+        Args:
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
+            pages: Numéros des pages à extraire (1-indexés, toutes par défaut)
+            compact: Encodage en colonnes (voir _columnar_layout)
+            workers: Nombre de processus d'extraction (1 = série, None = un par cœur)
+        
+        Returns:
+            iterator: Une ligne JSON par page, dans l'ordre des pages
+        """
+        return self._iter_extracted(input_path, self._page_indexes(input_path, pages), workers,
+                                    _page_layout, compact)
+    
+    @staticmethod
+    def _page_indexes(input_path, pages):
+        """Valide les numéros de pages demandés (1-indexés) et retourne leurs index"""
+        check_source(input_path)
+        
+        with open_pdf(input_path) as pdf_document:
+            page_count = pdf_document.page_count
+        
+        if pages is None:
+            return range(page_count)
+        for page_num in pages:
+            if page_num < 1 or page_num > page_count:
+                raise ValueError(f"Numéro de page invalide: {page_num}. Le PDF contient {page_count} pages.")
+        return [page_num - 1 for page_num in pages]
+    
+    def _iter_extracted(self, input_path, page_indexes, workers, extractor, *args):
+        """Générateur d'extraction : série sur un seul document ouvert, ou lots en parallèle"""
+        chunk = self.text_chunk_pages
+        shards = [page_indexes[start:start + chunk] for start in range(0, len(page_indexes), chunk)]
+        workers = min(workers or self.workers, len(shards))
+        
+        if workers <= 1:
+            with open_pdf(input_path) as pdf_document:
+                for page_num in page_indexes:
+                    yield extractor(pdf_document, page_num, *args)
+            return
+        
+        # Au plus 2 lots en vol par worker : mémoire bornée, ordre des pages conservé
+        with ProcessPoolExecutor(max_workers=workers, initializer=_open_extraction_worker,
+                                 initargs=(input_path,)) as executor:
+            pending = []
+            for shard in shards:
+                pending.append(executor.submit(_extract_pages, list(shard), extractor, *args))
+                if len(pending) >= workers * 2:
+                    yield from pending.pop(0).result()
+            for future in pending:
+                yield from future.result()
+    
     def get_pdf_info(self, input_path):
         """
         Obtient des informations sur un fichier PDF
         
         Args:
-            input_path: Chemin du fichier PDF
+            input_path: Chemin du fichier PDF (ou contenu en octets)
         
         Returns:
             dict: Informations sur le PDF
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
+            check_source(input_path)
             
-            pdf_document = fitz.open(input_path)
+            pdf_document = open_pdf(input_path)
             
             info = {
                 'page_count': pdf_document.page_count,
-                'file_size_mb': round(os.path.getsize(input_path) / (1024 * 1024), 2),
+                'file_size_mb': round(source_size(input_path) / (1024 * 1024), 2),
                 'metadata': pdf_document.metadata,
                 'is_encrypted': pdf_document.is_encrypted,
                 'is_pdf': pdf_document.is_pdf
@@ -209,6 +689,6 @@ class PDFConverter:
             
             pdf_document.close()
             return info
-            
+        
         except Exception as e:
             raise RuntimeError(f"Erreur lors de l'analyse du PDF: {str(e)}")
\ No newline at end of file
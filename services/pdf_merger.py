@@ -4,43 +4,105 @@
 
 import PyPDF2
 from PyPDF2 import PdfWriter, PdfReader
-import os
+import fitz  # PyMuPDF
+import io
+from services.pdf_source import check_source, is_in_memory, open_pdf
+from services.pdf_optimizer import PDFOptimizer
 
 class PDFMerger:
     """Service pour fusionner des fichiers PDF"""
     
-    def merge_pdfs(self, input_files, output_path):
+    def __init__(self, engine='pymupdf'):
+        # 'pymupdf' (insert_pdf, par défaut) ou 'pypdf2' (pur Python, solution de repli)
+        self.supported_engines = ['pymupdf', 'pypdf2']
+        self.engine = engine
+        # Images et polices fusionnées lors de la dernière fusion (moteur PyMuPDF)
+        self.last_report = None
+    
+    def merge_pdfs(self, input_files, output_path=None, engine=None, deduplicate=True):
         """
         Fusionne plusieurs fichiers PDF en un seul
         
         Args:
-            input_files: Liste des chemins des fichiers PDF à fusionner
-            output_path: Chemin du fichier de sortie
+            input_files: Liste des chemins des fichiers PDF à fusionner (ou de contenus en octets)
+            output_path: Chemin du fichier de sortie (None = retourner les octets)
+            engine: Moteur de fusion ('pymupdf' ou 'pypdf2', self.engine par défaut)
+            deduplicate: Stocker une seule fois les images et polices répétées d'un fichier à l'autre
+                         (moteur PyMuPDF ; bilan dans last_report)
+        
+        Returns:
+            bool ou bytes: True si la fusion a réussi, ou le PDF fusionné si output_path est None
         """
         try:
-            merger = PdfWriter()
+            engine = engine or self.engine
+            if engine not in self.supported_engines:
+                raise ValueError(f"Moteur non supporté: {engine}. Utilisez: {self.supported_engines}")
             
             for pdf_file in input_files:
-                if not os.path.exists(pdf_file):
-                    raise FileNotFoundError(f"Fichier non trouvé: {pdf_file}")
-                
-                with open(pdf_file, 'rb') as file:
-                    reader = PdfReader(file)
-                    
+                check_source(pdf_file)
+            
+            self.last_report = None
+            if engine == 'pymupdf':
+                data = self._merge_with_pymupdf(input_files, output_path, deduplicate)
+            else:
+                data = self._merge_with_pypdf2(input_files, output_path)
+            
+            return True if output_path else data
+        
+        except Exception as e:
+            raise Exception(f"Erreur lors de la fusion PDF: {str(e)}")
+    
+    def _merge_with_pymupdf(self, input_files, output_path, deduplicate=True):
+        """Fusion avec PyMuPDF : copie des pages en C, objets dédupliqués à l'écriture"""
+        merged = fitz.open()
+        
+        try:
+            for pdf_file in input_files:
+                with open_pdf(pdf_file) as source:
                     # Vérifier que le PDF n'est pas corrompu
-                    if reader.is_encrypted:
-                        raise ValueError(f"PDF crypté non supporté: {pdf_file}")
+                    if source.is_encrypted:
+                        raise ValueError(f"PDF crypté non supporté: {self._label(pdf_file)}")
                     
                     # Ajouter toutes les pages
-                    for page in reader.pages:
-                        merger.add_page(page)
-            
-            # Écrire le fichier fusionné
-            with open(output_path, 'wb') as output_file:
-                merger.write(output_file)
+                    merged.insert_pdf(source)
             
+            # garbage=4 supprime les objets inutilisés et fusionne les objets/flux identiques
+            optimizer = PDFOptimizer(deduplicate=deduplicate)
+            data = optimizer.save(merged, output_path)
+            self.last_report = optimizer.last_report
+            return data
+        finally:
+            merged.close()
+    
+    def _merge_with_pypdf2(self, input_files, output_path):
+        """Fusion avec PyPDF2 (pur Python)"""
+        merger = PdfWriter()
+        
+        for pdf_file in input_files:
+            with io.BytesIO(pdf_file) if is_in_memory(pdf_file) else open(pdf_file, 'rb') as file:
+                reader = PdfReader(file)
+                
+                # Vérifier que le PDF n'est pas corrompu
+                if reader.is_encrypted:
+                    raise ValueError(f"PDF crypté non supporté: {self._label(pdf_file)}")
+                
+                # Ajouter toutes les pages
+                for page in reader.pages:
+                    merger.add_page(page)
+        
+        # Écrire le fichier fusionné (ou le garder en mémoire)
+        if output_path is None:
+            buffer = io.BytesIO()
+            merger.write(buffer)
             merger.close()
-            return True
-            
-        except Exception as e:
-            raise Exception(f"Erreur lors de la fusion PDF: {str(e)}")
+            return buffer.getvalue()
+        
+        with open(output_path, 'wb') as output_file:
+            merger.write(output_file)
+        
+        merger.close()
+    
+    @staticmethod
+    def _label(pdf_file):
+        """Désignation d'une entrée dans les messages d'erreur"""
+        return 'document en mémoire' if is_in_memory(pdf_file) else pdf_file
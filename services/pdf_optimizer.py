@@ -0,0 +1,254 @@
+# ================================
+# services/pdf_optimizer.py - Optimisation structurelle sans perte
+# ================================
+
+import re
+import hashlib
+import inspect
+import fitz  # PyMuPDF
+from services.pdf_source import check_source, open_pdf
+
+# Les flux d'objets (use_objstms) ne sont disponibles que dans les versions récentes de PyMuPDF
+_SAVE_SUPPORTS_OBJSTMS = 'use_objstms' in inspect.signature(fitz.Document.save).parameters
+
+# Références indirectes dans la source d'un objet (« 12 0 R »)
+_REFERENCE = re.compile(r'\b(\d+) 0 R\b')
+_ICC_PROFILE = re.compile(r'/ICCBased\s*(\d+) 0 R')
+
+# Clés qui, avec le flux brut, déterminent le rendu d'une image ou le décodage d'un programme de police
+_IMAGE_KEYS = ('Filter', 'DecodeParms', 'Width', 'Height', 'BitsPerComponent', 'ColorSpace',
+               'Decode', 'ImageMask', 'Mask', 'SMask', 'Intent')
+_FONT_KEYS = ('Subtype', 'Filter', 'DecodeParms', 'Length1', 'Length2', 'Length3')
+_PROFILE_KEYS = ('N', 'Alternate', 'Range', 'Filter', 'DecodeParms')
+
+
+class PDFOptimizer:
+    """Service pour réécrire un PDF sans perte : structure nettoyée, pixels inchangés"""
+    
+    def __init__(self, deduplicate=True):
+        # garbage=4 : objets inutilisés supprimés et flux identiques fusionnés ;
+        # deflate : flux non compressés compressés (les images déjà encodées ne sont pas touchées) ;
+        # clean : flux de contenu assainis ; use_objstms : flux d'objets et table xref en flux
+        self.save_options = {'garbage': 4, 'deflate': True, 'deflate_images': True,
+                             'deflate_fonts': True, 'clean': True}
+        if _SAVE_SUPPORTS_OBJSTMS:
+            self.save_options['use_objstms'] = 1
+        # Fusion des images et polices identiques avant chaque sauvegarde (voir deduplicate_streams)
+        self.deduplicate = deduplicate
+        self.last_report = None
+    
+    def optimize_pdf(self, input_path, output_path=None):
+        """
+        Réécrit un PDF en supprimant le superflu (objets orphelins, doublons, anciennes révisions)
+        
+        Args:
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
+            output_path: Chemin du fichier optimisé (None = retourner les octets)
+        
+        Returns:
+            bool ou bytes: True si l'optimisation a réussi, ou le PDF optimisé si output_path est None
+        """
+        try:
+            check_source(input_path)
+            
+            pdf_document = open_pdf(input_path)
+            try:
+                if pdf_document.is_encrypted:
+                    raise ValueError("PDF crypté non supporté")
+                return self.save(pdf_document, output_path)
+            finally:
+                pdf_document.close()
+        
+        except Exception as e:
+            raise RuntimeError(f"Erreur lors de l'optimisation: {str(e)}")
+    
+    def save(self, pdf_document, output_path=None):
+        """
+        Enregistre un document ouvert avec les options d'optimisation (étape réutilisable)
+        
+        La sauvegarde est complète, jamais incrémentale : les révisions précédentes
+        accumulées dans le fichier disparaissent.
+        
+        Args:
+            pdf_document: Document PyMuPDF ouvert
+            output_path: Chemin du fichier produit (None = retourner les octets)
+        
+        Returns:
+            bool ou bytes: True, ou le contenu du PDF si output_path est None
+        """
+        if self.deduplicate:
+            self.last_report = self.deduplicate_streams(pdf_document)
+        if output_path is None:
+            return pdf_document.tobytes(**self.save_options)
+        pdf_document.save(output_path, **self.save_options)
+        return True
+    
+    def deduplicate_streams(self, pdf_document):
+        """
+        Fait pointer toutes les références vers un seul exemplaire de chaque image ou police
+        
+        garbage=4 ne fusionne que des objets identiques octet pour octet ; une même image
+        intégrée par deux fichiers fusionnés diffère souvent par des clés sans effet sur le
+        rendu, ou par son profil ICC, copié avec chaque fichier. Les flux sont comparés par
+        empreinte de leur contenu brut, objet par objet (seuls ceux de même longueur sont lus),
+        avec les clés qui déterminent leur décodage ; les profils ICC sont fusionnés d'abord
+        pour que les images qui les utilisent se comparent ensuite. Les exemplaires en double,
+        devenus orphelins, disparaissent à la sauvegarde.
+        
+        Args:
+            pdf_document: Document PyMuPDF ouvert (modifié sur place)
+        
+        Returns:
+            dict: Nombre d'images, de polices et de profils fusionnés, objets supprimés et octets
+                  économisés (flux en double, mesurés avant la compression à l'écriture)
+        """
+        images, fonts, profiles = [], [], set()
+        for xref in range(1, pdf_document.xref_length()):
+            if not pdf_document.xref_is_stream(xref):
+                if pdf_document.xref_get_key(xref, 'Type')[1] == '/FontDescriptor':
+                    for key in ('FontFile', 'FontFile2', 'FontFile3'):
+                        kind, value = pdf_document.xref_get_key(xref, key)
+                        if kind == 'xref':
+                            fonts.append(int(value.split()[0]))
+            elif pdf_document.xref_get_key(xref, 'Subtype')[1] == '/Image':
+                images.append(xref)
+                kind, colorspace = pdf_document.xref_get_key(xref, 'ColorSpace')
+                if kind == 'xref':
+                    colorspace = pdf_document.xref_object(int(colorspace.split()[0]), compressed=True)
+                profiles.update(int(match) for match in _ICC_PROFILE.findall(colorspace))
+        
+        canonical = {}
+        # Masques d'abord : les images qui y font référence se comparent ensuite masques fusionnés
+        images.sort(key=lambda xref: pdf_document.xref_get_key(xref, 'SMask')[0] == 'xref')
+        saved = {'images': 0, 'fonts': 0, 'profiles': 0, 'bytes_saved': 0}
+        for kind, xrefs, keys in (('profiles', sorted(profiles), _PROFILE_KEYS),
+                                  ('images', images, _IMAGE_KEYS),
+                                  ('fonts', sorted(set(fonts)), _FONT_KEYS)):
+            by_length = {}
+            for xref in xrefs:
+                by_length.setdefault(self._stream_length(pdf_document, xref), []).append(xref)
+            
+            for length, candidates in by_length.items():
+                if len(candidates) < 2:
+                    continue
+                seen = {}
+                for xref in candidates:
+                    digest = hashlib.sha256(pdf_document.xref_stream_raw(xref)).digest()
+                    signature = (digest, tuple(self._key_signature(pdf_document, xref, key, canonical) for key in keys))
+                    if signature in seen:
+                        canonical[xref] = seen[signature]
+                        saved[kind] += 1
+                        saved['bytes_saved'] += length
+                    else:
+                        seen[signature] = xref
+        
+        if canonical:
+            self._redirect_references(pdf_document, canonical)
+        saved['objects_collapsed'] = saved['images'] + saved['fonts'] + saved['profiles']
+        return saved
+    
+    @staticmethod
+    def _stream_length(pdf_document, xref):
+        """Longueur du flux brut lue dans le dictionnaire (sans lire le flux si possible)"""
+        kind, value = pdf_document.xref_get_key(xref, 'Length')
+        if kind == 'int':
+            return int(value)
+        return len(pdf_document.xref_stream_raw(xref))
+    
+    @staticmethod
+    def _canonical_value(value, canonical):
+        """
+        Valeur de clé où les références aux doublons déjà trouvés pointent vers l'exemplaire gardé
+        
+        Les chaînes (littérales ou hexadécimales) sont recopiées telles quelles : un texte
+        « 12 0 R » n'y est pas une référence.
+        """
+        def redirect(match):
+            return f"{canonical.get(int(match.group(1)), int(match.group(1)))} 0 R"
+        return ''.join(segment if is_string else _REFERENCE.sub(redirect, segment)
+                       for is_string, segment in _split_strings(value))
+    
+    def _key_signature(self, pdf_document, xref, key, canonical):
+        """
+        Valeur d'une clé pour la comparaison : un objet indirect hors flux (tableau d'espace
+        colorimétrique, par exemple) est comparé par son contenu plutôt que par son numéro
+        """
+        kind, value = pdf_document.xref_get_key(xref, key)
+        if kind == 'xref':
+            target = int(value.split()[0])
+            if not pdf_document.xref_is_stream(target):
+                value = pdf_document.xref_object(target, compressed=True)
+        return self._canonical_value(value, canonical)
+    
+    def _redirect_references(self, pdf_document, canonical):
+        """
+        Réécrit chaque référence indirecte à un doublon, clé par clé (jamais les flux ni les chaînes)
+        
+        Les valeurs de premier niveau sont lues et réécrites par xref_get_key/xref_set_key ;
+        seuls les dictionnaires et tableaux imbriqués sont parcourus en dehors de leurs chaînes.
+        """
+        for xref in range(1, pdf_document.xref_length()):
+            if xref in canonical:
+                continue
+            source = pdf_document.xref_object(xref, compressed=True)
+            if ' 0 R' not in source:
+                continue
+            
+            keys = pdf_document.xref_get_keys(xref)
+            if not keys:
+                # Objet tableau (espace colorimétrique indirect, par exemple)
+                if source.lstrip().startswith('[') and not pdf_document.xref_is_stream(xref):
+                    updated = self._canonical_value(source, canonical)
+                    if updated != source:
+                        pdf_document.update_object(xref, updated)
+                continue
+            
+            for key in keys:
+                kind, value = pdf_document.xref_get_key(xref, key)
+                if kind not in ('xref', 'dict', 'array'):
+                    continue
+                updated = self._canonical_value(value, canonical)
+                if updated != value:
+                    pdf_document.xref_set_key(xref, key, updated)
+
+
+def _split_strings(source):
+    """
+    Découpe une source d'objet PDF en segments (est_une_chaîne, texte)
+    
+    Chaînes littérales (parenthèses équilibrées, échappements par barre oblique inverse) et
+    chaînes hexadécimales (<...>, à distinguer des dictionnaires <<...>>) sont isolées.
+    """
+    segments = []
+    start = index = 0
+    length = len(source)
+    while index < length:
+        char = source[index]
+        if char == '(':
+            end, depth = index, 0
+            while end < length:
+                if source[end] == '\\':
+                    end += 2
+                    continue
+                if source[end] == '(':
+                    depth += 1
+                elif source[end] == ')':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                end += 1
+            end = min(end + 1, length)
+        elif char == '<' and source[index + 1:index + 2] != '<':
+            end = source.find('>', index)
+            end = length if end < 0 else end + 1
+        elif char == '<':
+            index += 2
+            continue
+        else:
+            index += 1
+            continue
+        segments.append((False, source[start:index]))
+        segments.append((True, source[index:end]))
+        start = index = end
+    segments.append((False, source[start:]))
+    return segments
@@ -0,0 +1,39 @@
+# ================================
+# services/pdf_source.py - Entrées PDF sur disque ou en mémoire
+# ================================
+
+import os
+import fitz  # PyMuPDF
+
+
+def is_in_memory(source):
+    """Indique si la source PDF est un contenu en octets plutôt qu'un chemin"""
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+
+def check_source(source):
+    """Vérifie qu'une source sur disque existe (les sources en mémoire sont toujours valides)"""
+    if not is_in_memory(source) and not os.path.exists(source):
+        raise FileNotFoundError(f"Le fichier {source} n'existe pas")
+
+
+def open_pdf(source):
+    """
+    Ouvre un PDF avec PyMuPDF depuis un chemin ou depuis des octets
+    
+    Args:
+        source: Chemin du fichier PDF ou contenu en octets
+    
+    Returns:
+        fitz.Document: Document ouvert
+    """
+    if is_in_memory(source):
+        return fitz.open(stream=bytes(source), filetype='pdf')
+    return fitz.open(source)
+
+
+def source_size(source):
+    """Taille en octets d'une source PDF"""
+    if is_in_memory(source):
+        return len(source)
+    return os.path.getsize(source)
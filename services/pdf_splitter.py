@@ -5,19 +5,22 @@
 import os
 import fitz  # PyMuPDF
 from pathlib import Path
+from services.pdf_source import check_source, open_pdf, source_size
 
 class PDFSplitter:
     """Service pour diviser des fichiers PDF"""
     
     def __init__(self):
-        self.supported_split_methods = ['pages', 'range', 'every_n_pages']
+        self.supported_split_methods = ['pages', 'range', 'every_n_pages', 'bookmarks']
+        # Options d'écriture des parties : objets inutilisés supprimés, flux compressés et nettoyés
+        self.save_options = {'garbage': 3, 'deflate': True, 'clean': True}
     
     def split_by_pages(self, input_path, output_dir, page_numbers):
         """
         Divise un PDF en pages individuelles
         
         Args:
-            input_path: Chemin du fichier PDF source
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
             output_dir: Dossier de sortie pour les pages
             page_numbers: Liste des numéros de pages à extraire (1-indexé)
         
@@ -25,41 +28,7 @@ class PDFSplitter:
             list: Liste des chemins des fichiers générés
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
-            
-            # Créer le dossier de sortie s'il n'existe pas
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Ouvrir le PDF source
-            pdf_document = fitz.open(input_path)
-            output_files = []
-            
-            # Vérifier que tous les numéros de pages sont valides
-            max_pages = pdf_document.page_count
-            for page_num in page_numbers:
-                if page_num < 1 or page_num > max_pages:
-                    raise ValueError(f"Numéro de page invalide: {page_num}. Le PDF contient {max_pages} pages.")
-            
-            # Extraire chaque page
-            for page_num in page_numbers:
-                # Créer un nouveau PDF avec une seule page
-                new_pdf = fitz.open()
-                new_pdf.insert_pdf(pdf_document, from_page=page_num-1, to_page=page_num-1)
-                
-                # Nom du fichier de sortie
-                output_filename = f"page_{page_num:03d}.pdf"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                # Sauvegarder le PDF
-                new_pdf.save(output_path)
-                new_pdf.close()
-                
-                output_files.append(output_path)
-            
-            pdf_document.close()
-            return output_files
-            
+            return self._split_to_dir(input_path, output_dir, 'pages', pages=page_numbers)
         except Exception as e:
             raise RuntimeError(f"Erreur lors de la division par pages: {str(e)}")
     
@@ -68,7 +37,7 @@ class PDFSplitter:
         Divise un PDF en plages de pages
         
         Args:
-            input_path: Chemin du fichier PDF source
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
             output_dir: Dossier de sortie pour les plages
             ranges: Liste de tuples (start, end) pour les plages (1-indexé)
         
@@ -76,39 +45,7 @@ class PDFSplitter:
             list: Liste des chemins des fichiers générés
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
-            
-            # Créer le dossier de sortie s'il n'existe pas
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Ouvrir le PDF source
-            pdf_document = fitz.open(input_path)
-            output_files = []
-            max_pages = pdf_document.page_count
-            
-            # Vérifier et traiter chaque plage
-            for i, (start, end) in enumerate(ranges):
-                if start < 1 or end > max_pages or start > end:
-                    raise ValueError(f"Plage invalide: {start}-{end}. Le PDF contient {max_pages} pages.")
-                
-                # Créer un nouveau PDF avec la plage de pages
-                new_pdf = fitz.open()
-                new_pdf.insert_pdf(pdf_document, from_page=start-1, to_page=end-1)
-                
-                # Nom du fichier de sortie
-                output_filename = f"pages_{start:03d}-{end:03d}.pdf"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                # Sauvegarder le PDF
-                new_pdf.save(output_path)
-                new_pdf.close()
-                
-                output_files.append(output_path)
-            
-            pdf_document.close()
-            return output_files
-            
+            return self._split_to_dir(input_path, output_dir, 'range', ranges=ranges)
         except Exception as e:
             raise RuntimeError(f"Erreur lors de la division par plages: {str(e)}")
     
@@ -117,7 +54,7 @@ class PDFSplitter:
         Divise un PDF en fichiers de N pages chacun
         
         Args:
-            input_path: Chemin du fichier PDF source
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
             output_dir: Dossier de sortie pour les fichiers
             n_pages: Nombre de pages par fichier
         
@@ -125,134 +62,235 @@ class PDFSplitter:
             list: Liste des chemins des fichiers générés
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
-            
-            if n_pages < 1:
-                raise ValueError("Le nombre de pages par fichier doit être supérieur à 0")
-            
-            # Créer le dossier de sortie s'il n'existe pas
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Ouvrir le PDF source
-            pdf_document = fitz.open(input_path)
-            output_files = []
-            total_pages = pdf_document.page_count
-            
-            # Calculer le nombre de fichiers nécessaires
-            num_files = (total_pages + n_pages - 1) // n_pages  # Arrondi vers le haut
-            
-            for i in range(num_files):
-                start_page = i * n_pages
-                end_page = min((i + 1) * n_pages - 1, total_pages - 1)
-                
-                # Créer un nouveau PDF avec les pages de cette plage
-                new_pdf = fitz.open()
-                new_pdf.insert_pdf(pdf_document, from_page=start_page, to_page=end_page)
-                
-                # Nom du fichier de sortie
-                output_filename = f"part_{i+1:03d}_pages_{start_page+1:03d}-{end_page+1:03d}.pdf"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                # Sauvegarder le PDF
-                new_pdf.save(output_path)
-                new_pdf.close()
-                
-                output_files.append(output_path)
-            
-            pdf_document.close()
-            return output_files
-            
+            return self._split_to_dir(input_path, output_dir, 'every_n_pages', n_pages=n_pages)
         except Exception as e:
             raise RuntimeError(f"Erreur lors de la division par groupes: {str(e)}")
     
-    def split_by_bookmarks(self, input_path, output_dir):
+    def split_by_bookmarks(self, input_path, output_dir, level=1):
         """
         Divise un PDF selon les signets (bookmarks)
         
+        Seuls les signets de niveau <= level délimitent des fichiers ; les signets plus
+        profonds sont conservés dans la table des matières de leur partie.
+        
         Args:
-            input_path: Chemin du fichier PDF source
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
             output_dir: Dossier de sortie pour les fichiers
+            level: Profondeur de la table des matières à laquelle diviser (1 = chapitres)
         
         Returns:
             list: Liste des chemins des fichiers générés
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
-            
-            # Créer le dossier de sortie s'il n'existe pas
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Ouvrir le PDF source
-            pdf_document = fitz.open(input_path)
-            output_files = []
-            
-            # Obtenir la table des matières
+            return self._split_to_dir(input_path, output_dir, 'bookmarks', level=level)
+        except Exception as e:
+            raise RuntimeError(f"Erreur lors de la division par signets: {str(e)}")
+    
+    def iter_split(self, input_path, method, pages=None, ranges=None, n_pages=None, level=1):
+        """
+        Divise un PDF et produit les parties au fil de l'eau, sans passer par le disque
+        
+        Les paramètres sont validés avant la première partie ; les erreurs d'écriture
+        surviennent pendant l'itération.
+        
+        Args:
+            input_path: Chemin du fichier PDF source (ou contenu en octets)
+            method: Méthode de division ('pages', 'range', 'every_n_pages', 'bookmarks')
+            pages: Numéros de pages à extraire (méthode 'pages', 1-indexé)
+            ranges: Liste de tuples (start, end) (méthode 'range', 1-indexé)
+            n_pages: Nombre de pages par fichier (méthode 'every_n_pages')
+            level: Profondeur des signets à laquelle diviser (méthode 'bookmarks')
+        
+        Returns:
+            iterator: Tuples (nom du fichier, octets du PDF), dans l'ordre des parties
+        """
+        parts = self._split_documents(input_path, method, pages=pages, ranges=ranges, n_pages=n_pages,
+                                      level=level)
+        return ((output_filename, new_pdf.tobytes(**self.save_options)) for output_filename, new_pdf in parts)
+    
+    def _split_to_dir(self, input_path, output_dir, method, **options):
+        """Écrit chaque partie produite par le moteur dans output_dir"""
+        parts = self._split_documents(input_path, method, **options)
+        
+        # Créer le dossier de sortie s'il n'existe pas
+        os.makedirs(output_dir, exist_ok=True)
+        output_files = []
+        
+        for output_filename, new_pdf in parts:
+            output_path = os.path.join(output_dir, output_filename)
+            new_pdf.save(output_path, **self.save_options)
+            output_files.append(output_path)
+        
+        return output_files
+    
+    def _split_documents(self, input_path, method, pages=None, ranges=None, n_pages=None, level=1):
+        """
+        Moteur de division commun : ouvre la source une seule fois et planifie toutes les parties
+        
+        Returns:
+            iterator: Tuples (nom du fichier, fitz.Document de la partie) ; chaque document
+                      est fermé dès que l'itération passe à la partie suivante
+        """
+        check_source(input_path)
+        
+        if method not in self.supported_split_methods:
+            raise ValueError(f"Méthode de division non supportée: {method}")
+        
+        # Ouvrir le PDF source
+        pdf_document = open_pdf(input_path)
+        try:
+            parts = self._plan_parts(pdf_document, method, pages, ranges, n_pages, level)
+        except Exception:
+            pdf_document.close()
+            raise
+        
+        return self._iter_parts(pdf_document, parts)
+    
+    def _iter_parts(self, pdf_document, parts):
+        """Produit les parties en un seul passage sur le document source"""
+        try:
+            for from_page, to_page, output_filename, toc in parts:
+                # Créer un nouveau PDF avec les pages de cette partie
+                new_pdf = fitz.open()
+                try:
+                    new_pdf.insert_pdf(pdf_document, from_page=from_page, to_page=to_page)
+                    if toc:
+                        new_pdf.set_toc(toc)
+                    yield output_filename, new_pdf
+                finally:
+                    new_pdf.close()
+        finally:
+            pdf_document.close()
+    
+    def _plan_parts(self, pdf_document, method, pages=None, ranges=None, n_pages=None, level=1):
+        """
+        Calcule les parties à produire, avec les mêmes noms que les méthodes split_by_*
+        
+        Returns:
+            list: Tuples (première page, dernière page, nom du fichier, table des matières
+                  de la partie ou None), pages 0-indexées
+        """
+        max_pages = pdf_document.page_count
+        
+        if method == 'pages':
+            for page_num in pages:
+                if page_num < 1 or page_num > max_pages:
+                    raise ValueError(f"Numéro de page invalide: {page_num}. Le PDF contient {max_pages} pages.")
+            return [(page_num - 1, page_num - 1, f"page_{page_num:03d}.pdf", None) for page_num in pages]
+        
+        if method == 'range':
+            for start, end in ranges:
+                if start < 1 or end > max_pages or start > end:
+                    raise ValueError(f"Plage invalide: {start}-{end}. Le PDF contient {max_pages} pages.")
+            return [(start - 1, end - 1, f"pages_{start:03d}-{end:03d}.pdf", None) for start, end in ranges]
+        
+        if method == 'every_n_pages':
+            if n_pages < 1:
+                raise ValueError("Le nombre de pages par fichier doit être supérieur à 0")
+            parts = []
+            for i, start_page in enumerate(range(0, max_pages, n_pages)):
+                end_page = min(start_page + n_pages - 1, max_pages - 1)
+                parts.append((start_page, end_page,
+                              f"part_{i+1:03d}_pages_{start_page+1:03d}-{end_page+1:03d}.pdf", None))
+            return parts
+        
+        if method == 'bookmarks':
             toc = pdf_document.get_toc()
-            
             if not toc:
                 raise ValueError("Ce PDF ne contient pas de signets (table des matières)")
+            return self._plan_bookmark_parts(toc, max_pages, level)
+        
+        raise ValueError(f"Méthode de division non supportée: {method}")
+    
+    def _plan_bookmark_parts(self, toc, max_pages, level):
+        """
+        Découpe la table des matières au niveau demandé, sans parties qui se chevauchent
+        
+        Chaque signet de niveau <= level ouvre une partie qui s'arrête avant le signet
+        suivant de niveau <= level ; les signets plus profonds restent dans la table des
+        matières de la partie (niveaux et pages recalculés). Un signet sans page propre
+        (chapitre dont la première sous-section commence sur la même page) est repris en tête
+        de la partie suivante : son titre reste dans le nom du fichier et dans les signets.
+        """
+        if level < 1:
+            raise ValueError("Le niveau des signets doit être supérieur à 0")
+        
+        # Signets délimitant une partie (ignorer ceux sans page de destination)
+        splits = [i for i, (lvl, _, page_num) in enumerate(toc) if lvl <= level and 1 <= page_num <= max_pages]
+        if not splits:
+            raise ValueError(f"Aucun signet de niveau {level} ou moins dans ce PDF")
+        
+        parts = []
+        pending = []  # Signets parents sans page propre, en attente de la partie suivante
+        for n, i in enumerate(splits):
+            split_level, title, page_num = toc[i]
+            next_index = splits[n + 1] if n + 1 < len(splits) else len(toc)
             
-            # Traiter chaque signet
-            for i, (level, title, page_num) in enumerate(toc):
-                # Nettoyer le titre pour le nom de fichier
-                clean_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                clean_title = clean_title.replace(' ', '_')[:50]  # Limiter la longueur
-                
-                # Déterminer la page de fin
-                if i + 1 < len(toc):
-                    end_page = toc[i + 1][2] - 1
-                else:
-                    end_page = pdf_document.page_count - 1
-                
-                # Créer un nouveau PDF avec les pages de cette section
-                new_pdf = fitz.open()
-                new_pdf.insert_pdf(pdf_document, from_page=page_num-1, to_page=end_page)
-                
-                # Nom du fichier de sortie
-                output_filename = f"section_{i+1:03d}_{clean_title}.pdf"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                # Sauvegarder le PDF
-                new_pdf.save(output_path)
-                new_pdf.close()
-                
-                output_files.append(output_path)
+            # Déterminer la page de fin à partir du signet suivant de même niveau ou supérieur
+            if n + 1 < len(splits):
+                end_page = toc[next_index][2] - 2
+            else:
+                end_page = max_pages - 1
             
-            pdf_document.close()
-            return output_files
+            # Seuls les parents du signet courant restent en attente (pas ses frères vides)
+            headings = [entry for entry in pending if entry[0] < split_level] + [(split_level, title)]
             
-        except Exception as e:
-            raise RuntimeError(f"Erreur lors de la division par signets: {str(e)}")
+            # Section vide (le signet suivant commence sur la même page) : son contenu
+            # appartient à la partie suivante, qui reprend aussi son titre
+            if end_page < page_num - 1:
+                pending = headings
+                continue
+            pending = []
+            
+            # Table des matières de la partie : les signets d'en-tête puis les descendants
+            # (un niveau ne peut dépasser le précédent que de 1, signets intermédiaires écartés)
+            base_level = headings[0][0]
+            part_toc = []
+            for lvl, heading_title in headings:
+                heading_level = min(lvl - base_level + 1, part_toc[-1][0] + 1) if part_toc else 1
+                part_toc.append([heading_level, heading_title, 1])
+            for lvl, inner_title, inner_page in toc[i + 1:next_index]:
+                if page_num <= inner_page <= end_page + 1:
+                    inner_level = min(lvl - base_level + 1, part_toc[-1][0] + 1)
+                    part_toc.append([inner_level, inner_title, inner_page - page_num + 1])
+            
+            # Nettoyer les titres pour le nom de fichier
+            clean_titles = ["".join(c for c in heading_title if c.isalnum() or c in (' ', '-', '_')).strip()
+                            for _, heading_title in headings]
+            clean_title = '_'.join(t for t in clean_titles if t).replace(' ', '_')[:50]  # Limiter la longueur
+            
+            output_filename = f"section_{len(parts)+1:03d}_{clean_title}.pdf"
+            parts.append((page_num - 1, end_page, output_filename, part_toc))
+        
+        return parts
     
     def get_pdf_info(self, input_path):
         """
         Obtient des informations sur un fichier PDF pour la division
         
         Args:
-            input_path: Chemin du fichier PDF
+            input_path: Chemin du fichier PDF (ou contenu en octets)
         
         Returns:
             dict: Informations sur le PDF
         """
         try:
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Le fichier {input_path} n'existe pas")
+            check_source(input_path)
             
-            pdf_document = fitz.open(input_path)
+            pdf_document = open_pdf(input_path)
+            toc = pdf_document.get_toc()
             
             info = {
                 'page_count': pdf_document.page_count,
-                'file_size_mb': round(os.path.getsize(input_path) / (1024 * 1024), 2),
-                'has_bookmarks': len(pdf_document.get_toc()) > 0,
-                'bookmarks': pdf_document.get_toc(),
+                'file_size_mb': round(source_size(input_path) / (1024 * 1024), 2),
+                'has_bookmarks': len(toc) > 0,
+                'bookmarks': toc,
                 'is_encrypted': pdf_document.is_encrypted,
                 'is_pdf': pdf_document.is_pdf
             }
             
             pdf_document.close()
             return info
-            
+        
         except Exception as e:
             raise RuntimeError(f"Erreur lors de l'analyse du PDF: {str(e)}")
@@ -0,0 +1,238 @@
+# ================================
+# services/result_cache.py - Cache des résultats adressé par contenu
+# ================================
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Cache LRU des artefacts produits, indexé par (contenu, opération, paramètres)"""
+    
+    def __init__(self, cache_dir, max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # clé -> (chemin, taille)
+        self._lock = threading.Lock()
+        # Métadonnées des artefacts (moteur utilisé, rapports...) : un fichier JSON par clé
+        self.metadata_dir = os.path.join(cache_dir, 'metadata')
+        
+        os.makedirs(self.metadata_dir, exist_ok=True)
+        self._load_existing()
+    
+    @staticmethod
+    def hash_file(path, chunk_size=1024 * 1024):
+        """
+        Calcule le SHA-256 d'un fichier par blocs
+        
+        Args:
+            path: Chemin du fichier
+            chunk_size: Taille des blocs lus
+        
+        Returns:
+            str: Empreinte hexadécimale
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def make_key(operation, input_hashes, params=None):
+        """
+        Construit la clé de cache d'une opération
+        
+        Args:
+            operation: Nom de l'opération ('compress', 'images', 'split', ...)
+            input_hashes: Liste ordonnée des SHA-256 des fichiers d'entrée
+            params: Paramètres de l'opération (qualité, dpi, format, pages...)
+        
+        Returns:
+            str: Clé hexadécimale
+        """
+        payload = {
+            'operation': operation,
+            'inputs': list(input_hashes),
+            'params': ResultCache._normalize(params or {})
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _normalize(value):
+        """Normalise les paramètres pour que deux requêtes équivalentes partagent la même clé"""
+        if isinstance(value, dict):
+            return {str(k): ResultCache._normalize(v) for k, v in value.items() if v is not None}
+        if isinstance(value, (list, tuple)):
+            return [ResultCache._normalize(v) for v in value]
+        if isinstance(value, str):
+            return value.strip().lower()
+        return value
+    
+    def get(self, key):
+        """
+        Retourne le chemin de l'artefact en cache ou None
+        
+        Args:
+            key: Clé produite par make_key
+        
+        Returns:
+            str ou None: Chemin de l'artefact
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not os.path.exists(entry[0]):
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            path = entry[0]
+        
+        # Rafraîchir la date pour conserver l'ordre LRU au redémarrage
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+    
+    def put(self, key, source_path):
+        """
+        Déplace un artefact dans le cache
+        
+        Args:
+            key: Clé produite par make_key
+            source_path: Chemin du fichier produit (déplacé, pas copié)
+        
+        Returns:
+            str: Chemin à servir (dans le cache, ou source_path si trop volumineux)
+        """
+        size = os.path.getsize(source_path)
+        if size > self.max_bytes:
+            return source_path
+        
+        extension = os.path.splitext(source_path)[1]
+        cached_path = os.path.join(self.cache_dir, f"{key}{extension}")
+        shutil.move(source_path, cached_path)
+        
+        self._register(key, cached_path, size)
+        return cached_path
+    
+    def put_bytes(self, key, data, extension):
+        """
+        Écrit un artefact produit en mémoire directement dans le cache
+        
+        Args:
+            key: Clé produite par make_key
+            data: Contenu de l'artefact
+            extension: Extension du fichier (ex: '.pdf')
+        
+        Returns:
+            str ou None: Chemin dans le cache, ou None si l'artefact est trop volumineux
+        """
+        size = len(data)
+        if size > self.max_bytes:
+            return None
+        
+        cached_path = os.path.join(self.cache_dir, f"{key}{extension}")
+        with open(cached_path, 'wb') as f:
+            f.write(data)
+        
+        self._register(key, cached_path, size)
+        return cached_path
+    
+    def set_metadata(self, key, metadata):
+        """
+        Associe des métadonnées à un artefact en cache (supprimées avec lui)
+        
+        Args:
+            key: Clé produite par make_key
+            metadata: Dictionnaire sérialisable en JSON
+        """
+        with self._lock:
+            if key not in self._entries:
+                return
+        path = self._metadata_path(key)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+        os.replace(f"{path}.tmp", path)
+    
+    def get_metadata(self, key):
+        """Métadonnées d'un artefact en cache (None si absentes)"""
+        try:
+            with open(self._metadata_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _metadata_path(self, key):
+        return os.path.join(self.metadata_dir, f"{key}.json")
+    
+    def stats(self):
+        """Retourne les compteurs du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes
+            }
+    
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées jusqu'à respecter le budget"""
+        while self.current_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            path = self._entries[key][0]
+            self._drop(key)
+            self.evictions += 1
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def _register(self, key, cached_path, size):
+        """Indexe un fichier du cache et applique le budget"""
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (cached_path, size)
+            self.current_bytes += size
+            self._evict()
+    
+    def _drop(self, key):
+        """Retire une entrée de l'index (et ses métadonnées)"""
+        _, size = self._entries.pop(key)
+        self.current_bytes -= size
+        try:
+            os.remove(self._metadata_path(key))
+        except OSError:
+            pass
+    
+    def _load_existing(self):
+        """Reconstruit l'index à partir des fichiers déjà présents (du plus ancien au plus récent)"""
+        files = []
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            if os.path.isfile(path):
+                files.append((os.path.getmtime(path), path, filename))
+        
+        for _, path, filename in sorted(files):
+            key = os.path.splitext(filename)[0]
+            size = os.path.getsize(path)
+            self._entries[key] = (path, size)
+            self.current_bytes += size
+        
+        self._evict()
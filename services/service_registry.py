@@ -0,0 +1,70 @@
+# ================================
+# services/service_registry.py - Chargement différé des services PDF
+# ================================
+
+import importlib
+import threading
+
+
+class ServiceRegistry:
+    """Registre des services PDF : le module d'un service n'est importé qu'à sa première utilisation"""
+    
+    def __init__(self):
+        self._targets = {}  # nom -> ('module', 'Classe', modules à précharger)
+        self._classes = {}
+        self._lock = threading.Lock()
+    
+    def register(self, name, target, preload=()):
+        """
+        Déclare un service sans l'importer
+        
+        Args:
+            name: Nom du service ('merger', 'converter', ...)
+            target: Classe du service sous la forme 'module:Classe'
+            preload: Modules importés en plus par warm_up (dépendances que le service
+                     n'importe lui-même qu'au moment de s'en servir)
+        """
+        module_name, class_name = target.split(':')
+        self._targets[name] = (module_name, class_name, tuple(preload))
+    
+    def get(self, name):
+        """Retourne la classe d'un service, en important son module au premier appel"""
+        service_class = self._classes.get(name)
+        if service_class is not None:
+            return service_class
+        
+        if name not in self._targets:
+            raise KeyError(f"Service inconnu: {name}. Services disponibles: {list(self._targets)}")
+        module_name, class_name, _ = self._targets[name]
+        with self._lock:
+            if name not in self._classes:
+                self._classes[name] = getattr(importlib.import_module(module_name), class_name)
+            return self._classes[name]
+    
+    def create(self, name, *args, **kwargs):
+        """Instancie un service (arguments transmis au constructeur)"""
+        return self.get(name)(*args, **kwargs)
+    
+    def warm_up(self, names=None):
+        """
+        Importe tout de suite des services et leurs dépendances différées
+        
+        À appeler avant de créer les workers (gunicorn --preload) : les modules chargés une
+        fois sont partagés par tous les processus au lieu d'être importés par chacun.
+        
+        Args:
+            names: Services à charger (tous par défaut)
+        
+        Returns:
+            list: Noms des services chargés
+        """
+        names = list(self._targets) if names is None else list(names)
+        for name in names:
+            self.get(name)
+            for module_name in self._targets[name][2]:
+                importlib.import_module(module_name)
+        return names
+    
+    def loaded(self):
+        """Noms des services déjà importés"""
+        return list(self._classes)
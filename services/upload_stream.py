@@ -0,0 +1,127 @@
+# ================================
+# services/upload_stream.py - Réception des uploads en flux
+# ================================
+
+import io
+import os
+import uuid
+import hashlib
+from flask import Request
+from werkzeug.exceptions import UnsupportedMediaType
+from werkzeug.utils import secure_filename
+
+PDF_MAGIC = b'%PDF-'
+
+
+class InvalidPDFUpload(UnsupportedMediaType):
+    """Upload rejeté dès les premiers octets : ce n'est pas un PDF"""
+    description = 'Fichier non valide. Seuls les fichiers PDF sont acceptés.'
+
+
+class _PDFSniffer:
+    """Hachage et vérification de l'en-tête PDF au fil de l'écriture (commun disque / mémoire)"""
+    
+    # L'en-tête %PDF- peut être précédé de quelques octets parasites (tolérance usuelle)
+    sniff_size = 1024
+    
+    def _init_sniffer(self):
+        self.size = 0
+        self.is_pdf = False
+        self._head = b''
+        self._digest = hashlib.sha256()
+    
+    @property
+    def sha256(self):
+        """Empreinte SHA-256 des octets reçus"""
+        return self._digest.hexdigest()
+    
+    def write(self, data):
+        if not self.is_pdf:
+            self._sniff(data)
+        self._digest.update(data)
+        self.size += len(data)
+        return super().write(data)
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        # Werkzeug rembobine le flux à la fin de la partie : l'upload est alors complet
+        if offset == 0 and whence == io.SEEK_SET and not self.is_pdf:
+            self._reject()
+        return super().seek(offset, whence)
+    
+    def _sniff(self, data):
+        """Cherche l'en-tête PDF dans les premiers octets reçus"""
+        self._head += bytes(data[:self.sniff_size - len(self._head)])
+        if PDF_MAGIC in self._head:
+            self.is_pdf = True
+        elif len(self._head) >= self.sniff_size:
+            self._reject()
+    
+    def _reject(self):
+        """Libère les octets reçus et interrompt la lecture de la requête"""
+        self.close()
+        raise InvalidPDFUpload()
+
+
+class PDFUploadStream(_PDFSniffer, io.FileIO):
+    """Fichier d'upload écrit directement à sa place définitive, haché et vérifié au fil de l'eau"""
+    
+    def __init__(self, path):
+        super().__init__(path, 'w+b')
+        self.path = path
+        self._init_sniffer()
+    
+    def _reject(self):
+        """Supprime le fichier partiel et interrompt la lecture de la requête"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        raise InvalidPDFUpload()
+
+
+class PDFUploadBuffer(_PDFSniffer, io.BytesIO):
+    """Petit upload gardé en mémoire (aucun fichier dans uploads/), haché et vérifié au fil de l'eau"""
+    
+    path = None
+    
+    def __init__(self):
+        super().__init__()
+        self._init_sniffer()
+
+
+class PDFUploadRequest(Request):
+    """Requête Flask dont les fichiers PDF sont écrits directement dans le dossier d'upload"""
+    
+    upload_folder = 'uploads'
+    allowed_extensions = {'pdf'}
+    # Requêtes jusqu'à cette taille traitées entièrement en mémoire (0 = toujours sur disque)
+    in_memory_threshold = 0
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Les autres fichiers gardent le comportement par défaut (la route les refusera)
+        if not filename or '.' not in filename or \
+                filename.rsplit('.', 1)[1].lower() not in self.allowed_extensions:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        
+        # Taille totale inconnue (envoi par morceaux) : toujours sur disque
+        if total_content_length is not None and total_content_length <= self.in_memory_threshold:
+            stream = PDFUploadBuffer()
+        else:
+            path = os.path.join(self.upload_folder, f"{uuid.uuid4()}_{secure_filename(filename)}")
+            stream = PDFUploadStream(path)
+        self.upload_streams.append(stream)
+        return stream
+    
+    @property
+    def upload_streams(self):
+        """Flux d'upload créés pour cette requête"""
+        if not hasattr(self, '_upload_streams'):
+            self._upload_streams = []
+        return self._upload_streams
+    
+    def discard_uploads(self):
+        """Supprime les fichiers déjà reçus (requête rejetée en cours de réception)"""
+        for stream in self.upload_streams:
+            if not stream.closed:
+                stream.close()
+            if stream.path is not None and os.path.exists(stream.path):
+                os.remove(stream.path)
@@ -0,0 +1,57 @@
+# ================================
+# services/zip_stream.py - Génération d'archives ZIP en flux
+# ================================
+
+import io
+import zipfile
+
+
+class _ZipSink(io.RawIOBase):
+    """Tampon non positionnable : zipfile écrit alors des descripteurs de données en flux"""
+    
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offset = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._buffer += data
+        self._offset += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._offset
+    
+    def pop(self):
+        """Retourne et vide les octets écrits depuis le dernier appel"""
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def stream_zip(entries, compression=zipfile.ZIP_STORED):
+    """
+    Produit une archive ZIP morceau par morceau
+    
+    Args:
+        entries: Itérable de tuples (nom, octets), consommé au fil de l'eau (fermé avec
+                 l'archive si c'est un générateur, même interrompue)
+        compression: Méthode de compression des entrées (ZIP_STORED par défaut)
+    
+    Yields:
+        bytes: Morceaux de l'archive, un par entrée puis le répertoire central
+    """
+    sink = _ZipSink()
+    try:
+        with zipfile.ZipFile(sink, 'w', compression=compression) as zipf:
+            for name, data in entries:
+                zipf.writestr(name, data)
+                yield sink.pop()
+        # Le répertoire central est écrit à la fermeture
+        yield sink.pop()
+    finally:
+        close = getattr(entries, 'close', None)
+        if close is not None:
+            close()
@@ -0,0 +1,24 @@
+# ================================
+# tests/test_incompressible_registry.py - Registre des documents sans gain
+# ================================
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.incompressible_registry import IncompressibleRegistry
+
+
+def test_miss_applies_only_to_the_same_engine_and_quality(tmp_path):
+    registry = IncompressibleRegistry(str(tmp_path / 'registry.json'))
+    registry.record('abc', 'pymupdf', 'low')
+    
+    assert registry.is_incompressible('abc', 'pymupdf', 'low')
+    # Un autre niveau ou un autre moteur peut encore réduire le document : il est tenté
+    assert not registry.is_incompressible('abc', 'pymupdf', 'medium')
+    assert not registry.is_incompressible('abc', 'pymupdf', 'high')
+    assert not registry.is_incompressible('abc', 'ghostscript', 'low')
+    
+    # Relu depuis le disque
+    assert IncompressibleRegistry(str(tmp_path / 'registry.json')).is_incompressible('abc', 'pymupdf', 'low')
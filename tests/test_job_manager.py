@@ -0,0 +1,48 @@
+# ================================
+# tests/test_job_manager.py - Jobs asynchrones
+# ================================
+
+import os
+import sys
+import time
+import signal
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.job_manager import JobManager
+
+
+def _run_info_job(manager, pdf_path, timeout=60):
+    """Soumet un job 'info' et attend son état final"""
+    job = manager.create_job('info')
+    manager.submit(job, [pdf_path])
+    deadline = time.time() + timeout
+    while manager.get(job.id).status in ('queued', 'running'):
+        assert time.time() < deadline, "Job toujours en cours"
+        time.sleep(0.05)
+    return job
+
+
+def test_pool_recovers_after_worker_is_killed(tmp_path):
+    pdf_path = str(tmp_path / 'input.pdf')
+    pdf_document = fitz.open()
+    pdf_document.new_page()
+    pdf_document.save(pdf_path)
+    
+    manager = JobManager(str(tmp_path / 'jobs'), max_workers=1)
+    try:
+        assert _run_info_job(manager, pdf_path).status == 'done'
+        
+        # Worker tué comme par le noyau (manque de mémoire) : le pool est cassé
+        for pid in list(manager._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        
+        # Le job suivant échoue avec le pool (s'il y a été placé) ou part sur un pool neuf
+        assert _run_info_job(manager, pdf_path).status in ('done', 'failed')
+        job = _run_info_job(manager, pdf_path)
+        assert job.status == 'done'
+        assert job.result['info']['page_count'] == 1
+    finally:
+        manager.shutdown()
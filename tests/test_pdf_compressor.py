@@ -0,0 +1,61 @@
+# ================================
+# tests/test_pdf_compressor.py - Compression PyMuPDF
+# ================================
+
+import io
+import os
+import sys
+
+import fitz  # PyMuPDF
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.pdf_compressor import PDFCompressor
+
+COLOUR_KEY = '[250 255 0 5 250 255]'
+
+
+def _colour_keyed_pdf():
+    """Page couverte par une image à haute résolution dont le fond magenta est masqué par couleurs"""
+    img = Image.effect_noise((1800, 1800), 60).convert('RGB')
+    img.paste((252, 2, 252), (0, 0, 900, 1800))
+    buffer = io.BytesIO()
+    img.save(buffer, 'PNG')
+    
+    pdf_document = fitz.open()
+    page = pdf_document.new_page()
+    xref = page.insert_image(page.rect, stream=buffer.getvalue())
+    pdf_document.xref_set_key(xref, 'Mask', COLOUR_KEY)
+    return pdf_document.tobytes()
+
+
+def _image_masks(data):
+    """Valeur de /Mask de chaque image du document"""
+    pdf_document = fitz.open(stream=data)
+    return [pdf_document.xref_get_key(xref, 'Mask')
+            for xref in range(1, pdf_document.xref_length())
+            if pdf_document.xref_get_key(xref, 'Subtype')[1] == '/Image']
+
+
+@pytest.mark.parametrize('options', [
+    {'quality': 'medium'},
+    {'quality': 'low'},
+    {'quality': 'medium', 'content_aware': True},
+])
+def test_colour_key_mask_survives_compression(options):
+    source = _colour_keyed_pdf()
+    output = PDFCompressor(engine='pymupdf').compress_pdf(source, None, **options)
+    
+    masks = _image_masks(output)
+    assert masks
+    for kind, value in masks:
+        assert kind == 'array'
+        assert value.strip('[]').split() == COLOUR_KEY.strip('[]').split()
+
+
+def test_target_size_keeps_colour_keyed_image():
+    # Seule l'image pourrait faire gagner : elle n'est pas réencodée, la cible est donc inatteignable
+    with pytest.raises(RuntimeError, match='inatteignable'):
+        PDFCompressor(engine='pymupdf').compress_pdf(_colour_keyed_pdf(), None, target_size=20000)
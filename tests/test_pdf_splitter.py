@@ -0,0 +1,54 @@
+# ================================
+# tests/test_pdf_splitter.py - Division par signets
+# ================================
+
+import os
+import sys
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.pdf_splitter import PDFSplitter
+
+
+def _pdf_with_toc(pages, toc):
+    pdf_document = fitz.open()
+    for page_num in range(pages):
+        pdf_document.new_page().insert_text((72, 72), f"Page {page_num + 1}")
+    pdf_document.set_toc(toc)
+    return pdf_document.tobytes()
+
+
+def test_chapter_starting_with_a_subsection_keeps_its_title(tmp_path):
+    # Le chapitre 1 et sa première section commencent sur la même page
+    source = _pdf_with_toc(4, [
+        [1, 'Chapitre 1', 1],
+        [2, 'Section A', 1],
+        [2, 'Section B', 3],
+        [1, 'Chapitre 2', 4],
+    ])
+    
+    paths = PDFSplitter().split_by_bookmarks(source, str(tmp_path), level=2)
+    
+    names = [os.path.basename(path) for path in paths]
+    assert names == [
+        'section_001_Chapitre_1_Section_A.pdf',
+        'section_002_Section_B.pdf',
+        'section_003_Chapitre_2.pdf',
+    ]
+    first = fitz.open(paths[0])
+    assert first.page_count == 2
+    assert first.get_toc() == [[1, 'Chapitre 1', 1], [2, 'Section A', 1]]
+
+
+def test_empty_sibling_is_not_carried_into_the_next_part(tmp_path):
+    source = _pdf_with_toc(3, [
+        [1, 'Annexe vide', 1],
+        [1, 'Annexe', 1],
+        [1, 'Fin', 3],
+    ])
+    
+    paths = PDFSplitter().split_by_bookmarks(source, str(tmp_path), level=1)
+    
+    assert [os.path.basename(path) for path in paths] == ['section_001_Annexe.pdf', 'section_002_Fin.pdf']